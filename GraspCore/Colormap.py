@@ -0,0 +1,150 @@
+import numpy as np
+
+
+# ColorBrewer anchor colors, evenly spaced along each colormap
+# (the same anchors matplotlib interpolates for these names)
+_ANCHORS = {
+    'YlOrRd': [(255, 255, 204), (255, 237, 160), (254, 217, 118),
+               (254, 178, 76), (253, 141, 60), (252, 78, 42),
+               (227, 26, 28), (189, 0, 38), (128, 0, 38)],
+    'YlGnBu': [(255, 255, 217), (237, 248, 177), (199, 233, 180),
+               (127, 205, 187), (65, 182, 196), (29, 145, 192),
+               (34, 94, 168), (37, 52, 148), (8, 29, 88)],
+    'GnBu': [(247, 252, 240), (224, 243, 219), (204, 235, 197),
+             (168, 221, 181), (123, 204, 196), (78, 179, 211),
+             (43, 140, 190), (8, 104, 172), (8, 64, 129)],
+    'RdBu': [(103, 0, 31), (178, 24, 43), (214, 96, 77), (244, 165, 130),
+             (253, 219, 199), (247, 247, 247), (209, 229, 240),
+             (146, 197, 222), (67, 147, 195), (33, 102, 172), (5, 48, 97)],
+    'RdYlBu': [(165, 0, 38), (215, 48, 39), (244, 109, 67), (253, 174, 97),
+               (254, 224, 144), (255, 255, 191), (224, 243, 248),
+               (171, 217, 233), (116, 173, 209), (69, 117, 180), (49, 54, 149)],
+}
+
+LUT_SIZE = 256
+
+# Colormap used for each map type
+MAP_COLORMAPS = {
+    'quality': 'YlOrRd',
+    'angle': 'RdYlBu',
+    'width': 'YlGnBu',
+    'sin': 'RdBu_r',
+    'cos': 'GnBu_r',
+}
+
+# Value range spread over the colormap for each map type
+MAP_RANGES = {
+    'quality': (0.0, 1.0),
+    'angle': (-90.0, 90.0),
+    'width': (0.0, 150.0),
+    'sin': (-1.0, 1.0),
+    'cos': (-1.0, 1.0),
+}
+
+# Maximum, middle and minimum value labels of each color scale
+COLORBAR_LABELS = {
+    'quality': ("1.0", "0.5", "0.0"),
+    'width': ("150", "75", "0"),
+    'angle': ("90°", "0°", "-90°"),
+}
+
+
+def _build_lut(anchors, positions) -> np.ndarray:
+    """Linearly interpolate anchor colors into a (256, 3) uint8 table"""
+    anchors = np.asarray(anchors, dtype=np.float64) / 255
+    # Same arithmetic as matplotlib's segment lookup, so tables match it exactly
+    x = positions * (LUT_SIZE - 1)
+    samples = (LUT_SIZE - 1) * np.linspace(0, 1, LUT_SIZE)
+    index = np.searchsorted(x, samples)[1:-1]
+    distance = ((samples[1:-1] - x[index - 1]) / (x[index] - x[index - 1]))[:, np.newaxis]
+    lut = np.concatenate([anchors[:1],
+                          distance * (anchors[index] - anchors[index - 1]) + anchors[index - 1],
+                          anchors[-1:]])
+    return (np.clip(lut, 0, 1) * 255).astype(np.uint8)
+
+
+LUTS = {}
+for _name, _anchors in _ANCHORS.items():
+    _positions = np.linspace(0, 1, len(_anchors))
+    LUTS[_name] = _build_lut(_anchors, _positions)
+    LUTS[_name + '_r'] = _build_lut(_anchors[::-1], (1 - _positions)[::-1])
+for _lut in LUTS.values():
+    _lut.flags.writeable = False  # Shared by every caller
+
+
+def get_lut(name) -> np.ndarray:
+    """(256, 3) uint8 lookup table of a colormap name"""
+    if name not in LUTS:
+        # Names without built-in anchors are sampled once from matplotlib
+        from matplotlib import colormaps
+        lut = (colormaps[name](np.linspace(0, 1, LUT_SIZE))[:, :3] * 255).astype(np.uint8)
+        lut.flags.writeable = False
+        LUTS[name] = lut
+    return LUTS[name]
+
+
+def colormap_scratch(size):
+    """
+    Reusable (values, indices) buffers for apply_colormap(), for maps of up
+    to size pixels; any smaller map uses their leading part
+    """
+    return np.empty(size, dtype=np.float32), np.empty(size, dtype=np.intp)
+
+
+def _scratch_view(buffer, shape):
+    """Contiguous view of the leading part of a flat buffer"""
+    return buffer[:int(np.prod(shape))].reshape(shape)
+
+
+def colormap_indices(data, map_type, out=None, scratch=None) -> np.ndarray:
+    """
+    Quantize values of a map type into 0-255 lookup table indices
+    scratch: optional flat float32 buffer for the intermediate values
+    """
+    if scratch is None:
+        values = np.empty(data.shape, dtype=np.result_type(data, np.float32))
+    else:
+        values = _scratch_view(scratch, data.shape)
+    if map_type == 'sin':
+        np.sin(np.deg2rad(data, out=values), out=values)
+        data = values
+    elif map_type == 'cos':
+        np.cos(np.deg2rad(data, out=values), out=values)
+        data = values
+
+    low, high = MAP_RANGES.get(map_type, (0.0, 1.0))
+    np.subtract(data, np.float32(low), out=values)
+    np.multiply(values, np.float32(LUT_SIZE / (high - low)), out=values)
+    np.clip(values, 0, LUT_SIZE - 1, out=values)
+
+    if out is None:
+        out = np.empty(values.shape, dtype=np.uint8)
+    np.copyto(out, values, casting='unsafe')  # Truncate to table index
+    return out
+
+
+def apply_colormap(data, map_type, out=None, colormap=None, scratch=None) -> np.ndarray:
+    """
+    Color a 2D map with the lookup table of its map type
+    data: quality, angle (degrees), width or, for 'sin'/'cos', angle in degrees
+    out: optional (H, W, 3) uint8 buffer to write the colors into
+    colormap: optional colormap name overriding MAP_COLORMAPS
+    scratch: optional colormap_scratch() buffers, so no call allocates
+    """
+    lut = get_lut(colormap or MAP_COLORMAPS.get(map_type, 'YlOrRd'))
+    if scratch is None:
+        indices = colormap_indices(data, map_type)
+    else:
+        indices = colormap_indices(data, map_type, _scratch_view(scratch[1], data.shape),
+                                   scratch[0])
+    return np.take(lut, indices, axis=0, out=out, mode='clip')
+
+
+def colorbar_gradient(map_type, height, width=20, colormap=None) -> np.ndarray:
+    """(height, width, 3) uint8 vertical color scale, maximum at the top"""
+    lut = get_lut(colormap or MAP_COLORMAPS.get(map_type, 'YlOrRd'))
+    # From top to bottom, value from 1 to 0
+    values = 1.0 - np.arange(height) / height
+    indices = np.minimum((values * LUT_SIZE).astype(np.intp), LUT_SIZE - 1)
+    return np.ascontiguousarray(
+        np.broadcast_to(lut[indices][:, np.newaxis, :], (height, width, 3)))
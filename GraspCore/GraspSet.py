@@ -0,0 +1,194 @@
+import numpy as np
+
+
+GRASP_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('center', np.float64, (2,)),  # center axis midpoint (x, y) in image pixels
+    ('angle', np.float64),         # center axis direction in radians, y-axis down
+    ('length', np.float64),        # center axis length in image pixels
+    ('width_ratio', np.float64),   # width line length / axis length, NaN until marked
+])
+
+
+class GraspSet():
+    """
+    Grasps stored in one structured NumPy array with stable integer ids
+    Rows stay in insertion order, so later grasps draw and rasterize on top
+    of earlier ones. Column properties are live views of the stored rows.
+    """
+
+    def __init__(self, capacity=16) -> None:
+        self._data = np.zeros(capacity, dtype=GRASP_DTYPE)
+        self._count = 0
+        self._next_id = 1
+        self.revision = 0  # Bumped on every add, remove, edit or clear
+        self.geometry_revision = 0  # Bumped when center axes change: add, remove or clear
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, grasp_id):
+        return self.row_of(grasp_id) is not None
+
+    @property
+    def data(self):
+        return self._data[:self._count]
+
+    @property
+    def ids(self):
+        return self.data['id']
+
+    @property
+    def centers(self):
+        return self.data['center']
+
+    @property
+    def angles(self):
+        return self.data['angle']
+
+    @property
+    def lengths(self):
+        return self.data['length']
+
+    @property
+    def width_ratios(self):
+        return self.data['width_ratio']
+
+    def has_width(self):
+        """Mask of grasps whose width has been marked"""
+        return ~np.isnan(self.width_ratios)
+
+    def add(self, start, end, width_ratio=np.nan, grasp_id=None) -> int:
+        """Append a grasp from its center axis endpoints and return its id"""
+        if self._count == len(self._data):
+            grown = np.zeros(max(16, 2 * len(self._data)), dtype=GRASP_DTYPE)
+            grown[:self._count] = self._data[:self._count]
+            self._data = grown
+
+        if grasp_id is None:
+            grasp_id = self._next_id
+        self._next_id = max(self._next_id, grasp_id + 1)
+
+        dx = end[0] - start[0]
+        dy = end[1] - start[1]
+        row = self._data[self._count]
+        row['id'] = grasp_id
+        row['center'] = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+        row['angle'] = np.arctan2(dy, dx)
+        row['length'] = np.hypot(dx, dy)
+        row['width_ratio'] = width_ratio
+        self._count += 1
+        self.revision += 1
+        self.geometry_revision += 1
+        return grasp_id
+
+    def remove(self, grasp_id):
+        row = self.row_of(grasp_id)
+        if row is None:
+            return
+        self._data[row:self._count - 1] = self._data[row + 1:self._count]
+        self._count -= 1
+        self.revision += 1
+        self.geometry_revision += 1
+
+    def clear(self):
+        self._count = 0
+        self.revision += 1
+        self.geometry_revision += 1
+
+    def row_of(self, grasp_id):
+        """Row index of a grasp id, or None"""
+        rows = np.flatnonzero(self.ids == grasp_id)
+        return int(rows[0]) if len(rows) else None
+
+    def set_width_ratio(self, grasp_id, width_ratio):
+        row = self.row_of(grasp_id)
+        if row is None:
+            return False
+        self._data[row]['width_ratio'] = width_ratio
+        self.revision += 1
+        return True
+
+    def endpoints(self, rows=slice(None)):
+        """Center axis (start, end) as two (N, 2) arrays"""
+        data = self.data[rows]
+        half = (data['length'] / 2)[..., np.newaxis] * \
+            np.stack([np.cos(data['angle']), np.sin(data['angle'])], axis=-1)
+        return data['center'] - half, data['center'] + half
+
+    def width_endpoints(self, rows=slice(None)):
+        """Perpendicular (width) line (start, end) through the axis center, NaN if unmarked"""
+        data = self.data[rows]
+        perp_angle = data['angle'] + np.pi / 2
+        half = (data['length'] * data['width_ratio'] / 2)[..., np.newaxis] * \
+            np.stack([np.cos(perp_angle), np.sin(perp_angle)], axis=-1)
+        return data['center'] - half, data['center'] + half
+
+    def area_corners(self, rows=slice(None)):
+        """(N, 4, 2) corners of the rectangle the width line sweeps along the axis"""
+        starts, ends = self.endpoints(rows)
+        perp_starts, perp_ends = self.width_endpoints(rows)
+        half = (perp_ends - perp_starts) / 2
+        return np.stack([starts - half, starts + half, ends + half, ends - half], axis=1)
+
+    def bounds(self, rows=slice(None), padding=0, include_areas=False):
+        """
+        (N, 4) left, top, right, bottom around each grasp's axis and width line
+        include_areas adds the swept rectangle; unmarked grasps count their axis only
+        """
+        starts, ends = self.endpoints(rows)
+        points = [starts, ends, *self.width_endpoints(rows)]
+        if include_areas:
+            points.extend(np.moveaxis(self.area_corners(rows), 1, 0))
+        points = np.stack(points)
+        return np.concatenate([np.floor(np.nanmin(points, axis=0)) - padding,
+                               np.ceil(np.nanmax(points, axis=0)) + padding], axis=-1)
+
+    def widths(self):
+        """Width line length in image pixels, NaN if unmarked"""
+        return self.lengths * self.width_ratios
+
+    def axis_angles_degrees(self):
+        """Angle between center axis and positive x-axis, wrapped to -90 to 90 degrees"""
+        # Image y-axis points down, so flip the sign for a counter-clockwise angle
+        degrees = -np.degrees(self.angles)
+        degrees = np.where(degrees > 90, degrees - 180, degrees)
+        return np.where(degrees < -90, degrees + 180, degrees)
+
+    def distances(self, point):
+        """Distance from point to every center axis segment"""
+        starts, ends = self.endpoints()
+        axis = ends - starts
+        offset = np.asarray(point, dtype=np.float64) - starts
+        l2 = np.einsum('ij,ij->i', axis, axis)
+        t = np.clip(np.einsum('ij,ij->i', offset, axis) / np.where(l2 == 0, 1, l2), 0, 1)
+        return np.hypot(*(offset - t[:, np.newaxis] * axis).T)
+
+    def transformed(self, scale_x=1.0, scale_y=1.0, offset_x=0.0, offset_y=0.0):
+        """Copy with endpoints scaled then shifted, keeping ids and width ratios"""
+        starts, ends = self.endpoints()
+        scale = np.array([scale_x, scale_y])
+        offset = np.array([offset_x, offset_y])
+        starts = starts * scale + offset
+        ends = ends * scale + offset
+
+        result = GraspSet.from_array(self.to_array())
+        delta = ends - starts
+        result.data['center'] = (starts + ends) / 2
+        result.data['angle'] = np.arctan2(delta[:, 1], delta[:, 0])
+        result.data['length'] = np.hypot(delta[:, 0], delta[:, 1])
+        return result
+
+    def to_array(self):
+        """Copy of the stored rows as a GRASP_DTYPE array"""
+        return self.data.copy()
+
+    @classmethod
+    def from_array(cls, array):
+        """GraspSet holding a copy of GRASP_DTYPE rows"""
+        array = np.asarray(array, dtype=GRASP_DTYPE)
+        grasps = cls(max(16, len(array)))
+        grasps._data[:len(array)] = array
+        grasps._count = len(array)
+        grasps._next_id = int(array['id'].max()) + 1 if len(array) else 1
+        return grasps
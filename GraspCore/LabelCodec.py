@@ -0,0 +1,213 @@
+"""
+Compressed storage for label payloads
+
+    python -m GraspCore.LabelCodec PATH [PATH ...] [--quality uint8|float16] [--dry-run]
+
+The quality channel is quantized (uint8 or float16) and deflated; it is
+zero almost everywhere. Every other channel (angle, width) is constant
+over each grasp footprint, so those are stored as runs over the
+row-major pixel order: one start index and one value per channel for
+every place any of them changes. Angle and width decode exactly.
+The command compresses .glabel files in place and reports the ratio and
+decode throughput of each one.
+"""
+import argparse
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+CODEC_NAME = 'quantized-runs'
+QUALITY_DTYPES = {'uint8': np.uint8, 'float16': np.float16}
+QUALITY_CHANNEL = 'quality'
+
+
+def encode_payload(data, channels, quality_dtype='uint8', level=1):
+    """
+    Encode an (H, W, C) float32 payload
+    Returns (encoding, bytes); the encoding dictionary goes into the
+    label header and describes every section of the encoded bytes.
+    """
+    if quality_dtype not in QUALITY_DTYPES:
+        raise ValueError(f"Unknown quality dtype {quality_dtype}")
+    channels = list(channels)
+    height, width = data.shape[:2]
+
+    quality = data[:, :, channels.index(QUALITY_CHANNEL)]
+    if quality_dtype == 'uint8':
+        quality = np.rint(np.clip(quality, 0, 1) * 255).astype(np.uint8)
+    else:
+        quality = quality.astype(np.float16)
+
+    # Runs start wherever any run-coded channel changes value
+    run_channels = [name for name in channels if name != QUALITY_CHANNEL]
+    values = np.stack([data[:, :, channels.index(name)] for name in run_channels],
+                      axis=-1).reshape(height * width, len(run_channels)).astype(np.float32)
+    changed = np.any(values[1:] != values[:-1], axis=1)
+    starts = np.concatenate([[0], np.flatnonzero(changed) + 1]).astype(np.uint32)
+
+    sections, offset, chunks = {}, 0, []
+    for name, chunk in (('quality', zlib.compress(quality.tobytes(), level)),
+                        ('run_starts', starts.tobytes()),
+                        ('run_values', np.ascontiguousarray(values[starts]).tobytes())):
+        sections[name] = [offset, len(chunk)]
+        offset += len(chunk)
+        chunks.append(chunk)
+
+    encoding = {
+        'codec': CODEC_NAME,
+        'quality_dtype': quality_dtype,
+        'run_channels': run_channels,
+        'runs': len(starts),
+        'sections': sections,
+        'size': offset,
+    }
+    return encoding, b''.join(chunks)
+
+
+def decode_payload(encoding, shape, channels, buffer, out=None) -> np.ndarray:
+    """Decode encoded bytes back into a dense (H, W, C) float32 array"""
+    if encoding.get('codec') != CODEC_NAME:
+        raise ValueError(f"Unknown label codec {encoding.get('codec')}")
+    channels = list(channels)
+    height, width = shape[:2]
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+
+    def section(name):
+        offset, size = encoding['sections'][name]
+        return buffer[offset:offset + size]
+
+    quality = np.frombuffer(zlib.decompress(section('quality')),
+                            dtype=QUALITY_DTYPES[encoding['quality_dtype']]).reshape(height, width)
+    quality_out = out[:, :, channels.index(QUALITY_CHANNEL)]
+    if encoding['quality_dtype'] == 'uint8':
+        np.multiply(quality, np.float32(1 / 255), out=quality_out, casting='unsafe')
+    else:
+        quality_out[...] = quality
+
+    run_channels = encoding['run_channels']
+    starts = np.frombuffer(section('run_starts'), dtype=np.uint32)
+    values = np.frombuffer(section('run_values'), dtype=np.float32).reshape(-1, len(run_channels))
+    lengths = np.diff(starts, append=np.uint32(height * width))
+    for i, name in enumerate(run_channels):
+        out[:, :, channels.index(name)] = np.repeat(values[:, i], lengths).reshape(height, width)
+    return out
+
+
+def compress_label(path, quality_dtype='uint8', dry_run=False):
+    """
+    Re-encode one label file in place and measure it
+    Returns (path, stats dictionary or None, error message or None).
+    """
+    from GraspCore.LabelFile import encode_header, label_header, open_label, write_label
+    from GraspCore.LabelWriter import sync_file
+
+    try:
+        header, data = open_label(path)
+        data = np.array(data)
+        channels = header['channels']
+        stored_size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        encoding, encoded = encode_payload(data, channels, quality_dtype)
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoded = decode_payload(encoding, data.shape, channels, encoded)
+        decode_time = time.perf_counter() - start
+
+        quality = channels.index(QUALITY_CHANNEL)
+        others = [i for i in range(len(channels)) if i != quality]
+        if not np.array_equal(decoded[:, :, others], data[:, :, others]):
+            return path, None, 'run-coded channels did not decode exactly'
+
+        source = header['source']
+        if dry_run:
+            compressed_size = len(encode_header(label_header(
+                data.shape, channels, np.float32, source['name'], source['sha256'],
+                encoding, header.get('annotation')))) + len(encoded)
+        else:
+            # Write beside the original, sync, then swap: a crash never leaves half a file
+            temp = f"{path}.{os.getpid()}.tmp"
+            try:
+                compressed_size = write_label(temp, data, channels,
+                                              source_sha256=source['sha256'],
+                                              source_name=source['name'],
+                                              quality_dtype=quality_dtype,
+                                              annotation=header.get('annotation'))
+                sync_file(temp)
+                os.replace(temp, path)
+            finally:
+                if os.path.exists(temp):
+                    os.remove(temp)
+            sync_file(os.path.dirname(os.path.abspath(path)))
+
+        dense_size = len(encode_header(label_header(
+            data.shape, channels, np.float32, source['name'], source['sha256']))) + data.nbytes
+        return path, {
+            'stored_bytes': stored_size,
+            'compressed_bytes': compressed_size,
+            'ratio': dense_size / compressed_size,
+            'runs': encoding['runs'],
+            'quality_error': float(np.abs(decoded[:, :, quality] - data[:, :, quality]).max()),
+            'encode_ms': encode_time * 1000,
+            'decode_ms': decode_time * 1000,
+            'decode_mb_s': data.nbytes / decode_time / 1e6,
+        }, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _compress_job(job):
+    return compress_label(*job)
+
+
+def main(argv=None):
+    from GraspCore.LabelFile import LABEL_EXTENSION
+
+    parser = argparse.ArgumentParser(
+        description='Compress label files in place and report ratio and decode throughput')
+    parser.add_argument('paths', nargs='+', help='.glabel files or folders of them')
+    parser.add_argument('--quality', choices=sorted(QUALITY_DTYPES), default='uint8',
+                        help='storage type of the quality channel (default: uint8)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='only measure, leave the files unchanged')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(sorted(entry.path for entry in os.scandir(path)
+                                if entry.name.endswith(LABEL_EXTENSION)))
+        else:
+            files.append(path)
+
+    before = after = failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        jobs = [(path, args.quality, args.dry_run) for path in files]
+        for path, stats, error in pool.map(_compress_job, jobs, chunksize=16):
+            if error is not None:
+                failed += 1
+                print(f"Failed {path}: {error}", file=sys.stderr)
+                continue
+            before += stats['stored_bytes']
+            after += stats['compressed_bytes']
+            print(f"{path}: {stats['stored_bytes'] / 1024:.0f} KB -> "
+                  f"{stats['compressed_bytes'] / 1024:.1f} KB ({stats['ratio']:.1f}x vs float32), "
+                  f"{stats['runs']} runs, quality error {stats['quality_error']:.4f}, "
+                  f"decode {stats['decode_ms']:.2f} ms ({stats['decode_mb_s']:.0f} MB/s)")
+
+    print(f"{len(files) - failed} files, {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB"
+          f"{' (dry run)' if args.dry_run else ''}, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import numbers
+import os
+from collections import OrderedDict
+
+from GraspCore.LabelFile import LABEL_EXTENSION, label_channel, load_payload, read_label_header
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')  # Formats the file list accepts
+
+
+def index_source_images(dataset) -> dict:
+    """
+    Base name -> image path for the image folders of a dataset folder
+    Saved labels sit in dataset/labels/, next to the image folders.
+    """
+    images = {}
+    for entry in sorted(os.scandir(dataset), key=lambda e: e.name):
+        if entry.is_dir() and entry.name != 'labels':
+            for image in sorted(os.scandir(entry.path), key=lambda e: e.name):
+                base, ext = os.path.splitext(image.name)
+                if ext.lower() in IMAGE_EXTENSIONS:
+                    images.setdefault(base, image.path)
+    return images
+
+
+def label_path_for_image(image_path) -> str:
+    """Label file path of an image: dataset/labels/<base name>.glabel beside its folder"""
+    dataset = os.path.dirname(os.path.dirname(image_path))
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(dataset, 'labels', base_name + LABEL_EXTENSION)
+
+
+class LabelDataset():
+    """
+    Read-only access to the label files of a labels/ folder
+    Payloads are memmapped on first use and kept in an LRU of at most
+    max_open mappings; every array handed out is a view of a mapping, so
+    nothing is copied until it is actually read. Encoded (compressed)
+    files are decoded on first use and the decoded array is cached instead.
+    Memmaps keep no file position and a forked worker starts its own LRU,
+    so one instance can be shared with forked DataLoader workers. Pickling
+    (spawned workers) sends only the folder, names and headers.
+    """
+
+    def __init__(self, label_folder, max_open=64) -> None:
+        self.label_folder = label_folder
+        self.max_open = max_open
+        self.names = sorted(
+            entry.name[:-len(LABEL_EXTENSION)] for entry in os.scandir(label_folder)
+            if entry.name.endswith(LABEL_EXTENSION))
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._headers = {}          # name -> header, read once
+        self._payloads = OrderedDict()  # name -> memmap, least recently used first
+        self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return self._key(name) in self._index
+
+    def __getitem__(self, key):
+        """(H, W, C) read-only payload by index (Python or NumPy integer) or image name"""
+        return self.payload(self.names[key] if isinstance(key, numbers.Integral) else key)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_payloads'] = OrderedDict()  # Mappings do not travel, reopen on demand
+        return state
+
+    def path(self, name):
+        return os.path.join(self.label_folder, self._key(name) + LABEL_EXTENSION)
+
+    def header(self, name):
+        key = self._key(name)
+        if key not in self._index:
+            raise KeyError(name)
+        if key not in self._headers:
+            self._headers[key] = read_label_header(self.path(key))
+        return self._headers[key]
+
+    def payload(self, name):
+        """(H, W, C) read-only memmap (or decoded array) of one label file"""
+        if os.getpid() != self._pid:
+            # Forked copy, keep the inherited mappings out of this process's LRU
+            self._payloads = OrderedDict()
+            self._pid = os.getpid()
+
+        key = self._key(name)
+        payload = self._payloads.get(key)
+        if payload is not None:
+            self._payloads.move_to_end(key)
+            return payload
+
+        payload = load_payload(self.path(key), self.header(key), mode='r')
+        payload.flags.writeable = False
+        self._payloads[key] = payload
+        while len(self._payloads) > self.max_open:
+            # Views already handed out keep their mapping alive
+            self._payloads.popitem(last=False)
+        return payload
+
+    def channel(self, name, channel):
+        """(H, W) view of one named channel, e.g. 'quality'"""
+        return label_channel(self.payload(name), self.header(name), channel)
+
+    def channels(self, name):
+        """Dictionary of channel name -> (H, W) view"""
+        payload = self.payload(name)
+        return {channel: payload[:, :, i]
+                for i, channel in enumerate(self.header(name)['channels'])}
+
+    def close(self):
+        """Drop every open mapping"""
+        self._payloads.clear()
+
+    @staticmethod
+    def _key(name):
+        # Accept image names and paths as well as bare base names
+        return os.path.splitext(os.path.basename(name))[0]
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+from GraspCore.LabelCodec import decode_payload, encode_payload
+
+
+# File layout: magic, version (uint16), header length (uint32), JSON header
+# padded with spaces to HEADER_ALIGN, then the C-order (H, W, C) payload.
+# Version 2 adds encoded payloads (header 'encoding', see LabelCodec);
+# dense files are still written as version 1 so older readers keep working.
+LABEL_MAGIC = b'GRSPLBL\0'
+LABEL_VERSION = 2
+LABEL_EXTENSION = '.glabel'
+CHANNELS = ('quality', 'angle', 'width')  # Channel order written by the tool
+HEADER_ALIGN = 64  # Payload offset alignment, keeps memmapped rows aligned
+
+_PREFIX = struct.Struct('<8sHI')
+
+
+class LabelFormatError(ValueError):
+    """File is not a readable label container"""
+
+
+def file_sha256(path, chunk_size=1 << 20) -> str:
+    """Hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def label_header(shape, channels=CHANNELS, dtype=np.float32,
+                 source_name=None, source_sha256=None, encoding=None, annotation=None) -> dict:
+    """
+    Header describing an (H, W, C) label payload, dense unless encoding is given
+    annotation: optional summary of the annotations rasterized into the
+    payload, e.g. {'grasps': 3}, so listing a label needs no sidecar parse
+    """
+    shape = tuple(int(n) for n in shape)
+    if len(shape) != 3 or shape[2] != len(channels):
+        raise ValueError(f"Shape {shape} does not match channels {tuple(channels)}")
+    header = {
+        'shape': list(shape),
+        'dtype': np.dtype(dtype).str,
+        'channels': list(channels),
+        'source': {'name': source_name, 'sha256': source_sha256},
+    }
+    if encoding is not None:
+        header['encoding'] = encoding
+    if annotation is not None:
+        header['annotation'] = dict(annotation)
+    return header
+
+
+def encode_header(header) -> bytes:
+    """Serialized prefix and header, padded so the payload starts aligned"""
+    header = {key: value for key, value in header.items() if key not in ('version', 'offset')}
+    text = json.dumps(header, sort_keys=True).encode('utf-8')
+    padding = -(_PREFIX.size + len(text) + 1) % HEADER_ALIGN
+    text = text + b' ' * padding + b'\n'
+    version = 2 if 'encoding' in header else 1
+    return _PREFIX.pack(LABEL_MAGIC, version, len(text)) + text
+
+
+def decode_header(buffer, name='label') -> dict:
+    """
+    Header of a label file held in a bytes-like buffer, with 'version'
+    and payload 'offset' added; buffer only needs to reach the payload
+    """
+    prefix = bytes(buffer[:_PREFIX.size])
+    if len(prefix) < _PREFIX.size or prefix[:len(LABEL_MAGIC)] != LABEL_MAGIC:
+        raise LabelFormatError(
+            f"{name} is not a label file (raw labels can be converted "
+            f"with python -m GraspCore.LabelMigration)")
+    _, version, length = _PREFIX.unpack(prefix)
+    if version > LABEL_VERSION:
+        raise LabelFormatError(f"{name} has label format version {version}, "
+                               f"newest supported is {LABEL_VERSION}")
+    try:
+        header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + length]).decode('utf-8'))
+    except ValueError as e:
+        raise LabelFormatError(f"{name} has a corrupt header: {e}") from None
+
+    header['version'] = version
+    header['offset'] = _PREFIX.size + length
+    return header
+
+
+def payload_size(header) -> int:
+    """Stored payload size in bytes"""
+    if 'encoding' in header:
+        return header['encoding']['size']
+    return int(np.prod(header['shape'])) * np.dtype(header['dtype']).itemsize
+
+
+def dense_label_size(width, height, channels=CHANNELS, dtype=np.float32) -> int:
+    """Payload size in bytes of an uncompressed label of an image size"""
+    return width * height * len(channels) * np.dtype(dtype).itemsize
+
+
+def read_label_header(path) -> dict:
+    """Header of a label file, with 'version' and payload 'offset' added"""
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        length = _PREFIX.unpack(prefix)[2] if len(prefix) == _PREFIX.size else 0
+        header = decode_header(prefix + f.read(length), path)
+
+    if os.path.getsize(path) < header['offset'] + payload_size(header):
+        raise LabelFormatError(f"{path} is truncated")
+    return header
+
+
+def create_label(path, shape, channels=CHANNELS, dtype=np.float32,
+                 source_path=None, source_sha256=None, source_name=None,
+                 annotation=None) -> np.memmap:
+    """
+    Write a header and return the payload as a writable memmap
+    Fill it in place and flush(); nothing is buffered in memory.
+    """
+    if source_path is not None and source_sha256 is None:
+        source_sha256 = file_sha256(source_path)
+    header = label_header(shape, channels, dtype,
+                          source_name or (os.path.basename(source_path) if source_path else None),
+                          source_sha256, annotation=annotation)
+    prefix = encode_header(header)
+    with open(path, 'wb') as f:
+        f.write(prefix)
+        f.truncate(len(prefix) + payload_size(header))
+    return np.memmap(path, dtype=dtype, mode='r+', offset=len(prefix),
+                     shape=tuple(header['shape']))
+
+
+def write_label(path, data, channels=CHANNELS, source_path=None, source_sha256=None,
+                source_name=None, quality_dtype=None, annotation=None) -> int:
+    """
+    Write an (H, W, C) array as a label file, returns the file size
+    quality_dtype: 'uint8' or 'float16' to store the payload encoded
+    (see LabelCodec), None for a dense memory-mappable payload
+    """
+    if quality_dtype is None:
+        payload = create_label(path, data.shape, channels, data.dtype,
+                               source_path, source_sha256, source_name, annotation)
+        payload[...] = data
+        payload.flush()
+        return os.path.getsize(path)
+
+    if source_path is not None and source_sha256 is None:
+        source_sha256 = file_sha256(source_path)
+    encoding, encoded = encode_payload(data, channels, quality_dtype)
+    prefix = encode_header(label_header(
+        data.shape, channels, np.float32,
+        source_name or (os.path.basename(source_path) if source_path else None),
+        source_sha256, encoding, annotation))
+    with open(path, 'wb') as f:
+        f.write(prefix)
+        f.write(encoded)
+    return len(prefix) + len(encoded)
+
+
+def open_label(path, channels=None, mode='r'):
+    """
+    (header, payload) of a label file, the payload memmapped zero-copy
+    (encoded payloads are decoded into a new array instead)
+    channels: optional channel names to return in that order; a copy is
+    made only when it differs from the stored order
+    """
+    header = read_label_header(path)
+    payload = load_payload(path, header, mode)
+    if channels is not None and tuple(channels) != tuple(header['channels']):
+        missing = set(channels) - set(header['channels'])
+        if missing:
+            raise LabelFormatError(f"{path} has no channel {', '.join(sorted(missing))}")
+        payload = payload[:, :, [header['channels'].index(name) for name in channels]]
+    return header, payload
+
+
+def load_payload(path, header, mode='r') -> np.ndarray:
+    """Memmap of a dense payload, or the decoded array of an encoded one"""
+    if 'encoding' not in header:
+        return map_payload(path, header, mode)
+    with open(path, 'rb') as f:
+        f.seek(header['offset'])
+        encoded = f.read(payload_size(header))
+    return decode_payload(header['encoding'], tuple(header['shape']), header['channels'], encoded)
+
+
+def map_payload(path, header, mode='r') -> np.memmap:
+    """Memmap the payload described by an already read header"""
+    return np.memmap(path, dtype=np.dtype(header['dtype']), mode=mode,
+                     offset=header['offset'], shape=tuple(header['shape']))
+
+
+def label_channel(payload, header, name) -> np.ndarray:
+    """View of one named channel of an opened payload"""
+    return payload[:, :, header['channels'].index(name)]
@@ -0,0 +1,123 @@
+"""
+Convert raw float32 labels written with tofile() into label files
+
+    python -m GraspCore.LabelMigration DATASET [DATASET ...] [--workers N]
+
+DATASET is the folder holding the image folder(s) and labels/. Raw labels
+have no header, so each one is sized from its source image scaled to fit
+the 640x480 view, exactly as the tool did when saving it.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from GraspCore.LabelDataset import index_source_images
+from GraspCore.LabelFile import CHANNELS, LABEL_EXTENSION, write_label
+
+
+LEGACY_EXTENSION = '.mat'
+LEGACY_CHANNELS = ('quality', 'width', 'angle')  # Order raw tofile() labels were written in
+VIEW_SIZE = (640, 480)
+
+
+def fit_size(width, height, max_width=VIEW_SIZE[0], max_height=VIEW_SIZE[1]):
+    """Size of an image scaled to fit (max_width, max_height) keeping aspect ratio"""
+    # Same integer arithmetic as QSize.scaled(..., Qt.KeepAspectRatio)
+    scaled_width = max_height * width // height
+    if scaled_width <= max_width:
+        return scaled_width, max_height
+    return max_width, max_width * height // width
+
+
+def find_legacy_labels(dataset):
+    """(label path, source image path or None) for every raw label of a dataset folder"""
+    label_folder = os.path.join(dataset, 'labels')
+    if not os.path.isdir(label_folder):
+        return []
+
+    images = index_source_images(dataset)
+    return [(entry.path, images.get(os.path.splitext(entry.name)[0]))
+            for entry in sorted(os.scandir(label_folder), key=lambda e: e.name)
+            if entry.name.endswith(LEGACY_EXTENSION)]
+
+
+def migrate_label(label_path, image_path, overwrite=False):
+    """Convert one raw label, returns (label path, output path, error message or None)"""
+    output_path = os.path.splitext(label_path)[0] + LABEL_EXTENSION
+    try:
+        if os.path.exists(output_path) and not overwrite:
+            return label_path, output_path, 'skipped, already converted'
+        if image_path is None:
+            return label_path, None, 'no source image found'
+
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            return label_path, None, f'cannot decode {image_path}'
+        width, height = fit_size(image.shape[1], image.shape[0])
+
+        raw = np.fromfile(label_path, dtype=np.float32)
+        if raw.size != height * width * len(LEGACY_CHANNELS):
+            return label_path, None, (f'{raw.size} values do not match '
+                                      f'{width}x{height} from {image_path}')
+        raw = raw.reshape(height, width, len(LEGACY_CHANNELS))
+
+        data = raw[:, :, [LEGACY_CHANNELS.index(name) for name in CHANNELS]]
+        write_label(output_path, data, CHANNELS,
+                    source_path=image_path,
+                    source_sha256=hashlib.sha256(image_bytes).hexdigest())
+        return label_path, output_path, None
+    except Exception as e:
+        return label_path, None, str(e)
+
+
+def _migrate_job(job):
+    return migrate_label(*job)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Convert raw .mat labels into self-describing label files')
+    parser.add_argument('datasets', nargs='+', help='folders containing labels/ and image folders')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='convert again even if the label file exists')
+    parser.add_argument('--remove', action='store_true',
+                        help='delete each raw label once converted')
+    args = parser.parse_args(argv)
+
+    jobs = [(label_path, image_path, args.overwrite)
+            for dataset in args.datasets
+            for label_path, image_path in find_legacy_labels(dataset)]
+
+    start = time.perf_counter()
+    converted = failed = skipped = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for label_path, output_path, error in pool.map(
+                _migrate_job, jobs, chunksize=max(1, len(jobs) // (4 * max(1, args.workers)))):
+            if error is None:
+                converted += 1
+                print(f"Converted {label_path} -> {output_path}")
+                if args.remove:
+                    os.remove(label_path)
+            elif output_path is not None:
+                skipped += 1
+            else:
+                failed += 1
+                print(f"Failed {label_path}: {error}", file=sys.stderr)
+
+    print(f"{converted} converted, {skipped} skipped, {failed} failed "
+          f"in {time.perf_counter() - start:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
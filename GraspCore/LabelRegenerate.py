@@ -0,0 +1,281 @@
+"""
+Rebuild label files from grasp sidecars, without the GUI
+
+    python -m GraspCore.LabelRegenerate PATH [PATH ...] [--scale F | --size WxH]
+        [--sigma-ratio R] [--quality uint8|float16] [--output FOLDER]
+        [--workers N] [--restart]
+
+PATH is a dataset folder, a labels/ folder or a single .grasps.json file.
+Worker processes rasterize into a small ring of shared memory buffers and
+the main process writes each label from there (temp file, fsync, rename),
+so maps are never pickled between processes. Every finished label is
+appended to regenerate.jsonl in its output folder together with its
+per-stage timings; running the same command again skips labels already
+regenerated from an unchanged sidecar with the same settings, so an
+interrupted run resumes where it stopped.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from GraspCore.LabelFile import CHANNELS, LABEL_EXTENSION, read_label_header, write_label
+from GraspCore.LabelSidecar import (SIDECAR_EXTENSION, find_sidecars, label_matches_sidecar,
+                                    output_size, read_sidecar, render_sidecar)
+from GraspCore.LabelWriter import sync_file
+
+
+JOURNAL_NAME = 'regenerate.jsonl'
+PROGRESS_INTERVAL = 2.0  # Seconds between progress lines
+
+_segments = {}  # Shared memory attached by this worker process, by name
+
+
+def parse_image_size(text):
+    """(width, height) from text such as '1280x960'"""
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def _ignore_interrupt():
+    # Ctrl+C reaches the whole process group, the main process cleans up
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _attach(name):
+    segment = _segments.get(name)
+    if segment is None:
+        try:
+            segment = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            segment = shared_memory.SharedMemory(name)  # Python < 3.13
+        _segments[name] = segment
+    return segment
+
+
+def render_into(sidecar_path, segment_name, shape, size, sigma_ratio):
+    """
+    Worker side: rasterize one sidecar into a shared memory buffer
+    Returns (source dictionary, label header annotation, render seconds).
+    """
+    start = time.perf_counter()
+    out = np.ndarray(shape, dtype=np.float32, buffer=_attach(segment_name).buf)
+    try:
+        _, sidecar = render_sidecar(sidecar_path, size, sigma_ratio, out=out)
+    finally:
+        del out  # The mapping stays open for the next job
+    annotation = {'grasps': len(sidecar['grasps'])}
+    if sidecar.get('save_id') is not None:
+        annotation['save_id'] = sidecar['save_id']  # Keeps the pair matching
+    return sidecar['source'], annotation, time.perf_counter() - start
+
+
+def read_journal(folder):
+    """(sidecar path, sidecar mtime_ns, settings) of every label logged as done in folder"""
+    done = set()
+    try:
+        with open(os.path.join(folder, JOURNAL_NAME), encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    done.add((entry['sidecar'], entry['mtime'], entry['settings']))
+                except (ValueError, KeyError):
+                    continue  # Line cut short by an interrupted run
+    except OSError:
+        pass
+    return done
+
+
+def _percentiles(values):
+    values = np.asarray(values) * 1000
+    return (f"mean {values.mean():.1f} ms, p50 {np.percentile(values, 50):.1f}, "
+            f"p95 {np.percentile(values, 95):.1f}, max {values.max():.1f}")
+
+
+def _duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def regenerate(paths, output=None, scale=None, size=None, sigma_ratio=None,
+               quality_dtype=None, workers=None, restart=False, log=print):
+    """
+    Regenerate the labels of every sidecar under paths
+    Returns (regenerated, skipped, failed) counts.
+    """
+    settings = json.dumps([scale, list(size) if size else None, sigma_ratio, quality_dtype])
+    journals = {}  # output folder -> set of done entries
+    jobs, skipped = [], 0
+    for path in paths:
+        for sidecar in find_sidecars(path):
+            sidecar = os.path.abspath(sidecar)
+            folder = output or os.path.dirname(sidecar)
+            if folder not in journals:
+                journals[folder] = set() if restart else read_journal(folder)
+            base = os.path.basename(sidecar)[:-len(SIDECAR_EXTENSION)]
+            label_path = os.path.join(folder, base + LABEL_EXTENSION)
+            mtime = os.stat(sidecar).st_mtime_ns
+            if (sidecar, mtime, settings) in journals[folder] and os.path.exists(label_path):
+                skipped += 1
+                continue
+            jobs.append((sidecar, mtime, label_path))
+
+    total = len(jobs)
+    log(f"{total} labels to regenerate, {skipped} already done")
+    if not jobs:
+        return 0, skipped, 0
+
+    # Output shapes first, so the shared buffers can hold the largest map
+    shapes, failed, stale = {}, 0, 0
+    for sidecar, _, label_path in jobs:
+        try:
+            sidecar_data = read_sidecar(sidecar)[2]
+            width, height = output_size(sidecar_data, scale, size)
+            shapes[sidecar] = (height, width, len(CHANNELS))
+        except Exception as e:
+            failed += 1
+            log(f"Failed {sidecar}: {e}")
+            continue
+        try:
+            stale += not label_matches_sidecar(read_label_header(label_path), sidecar_data)
+        except (OSError, ValueError):
+            pass  # No readable label yet
+    if stale:
+        log(f"{stale} labels are older than their sidecars (interrupted saves), "
+            f"rebuilding them from the sidecars")
+    jobs = [job for job in jobs if job[0] in shapes]
+    if not jobs:
+        return 0, skipped, failed
+    buffer_size = max(int(np.prod(shape)) * 4 for shape in shapes.values())
+
+    workers = max(1, workers or os.cpu_count())
+    segments = [shared_memory.SharedMemory(create=True, size=buffer_size)
+                for _ in range(min(2 * workers, len(jobs)))]
+    journal_files = {}
+    render_times, write_times = [], []
+    done = 0
+    start = last_progress = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_ignore_interrupt) as pool:
+            queue = iter(jobs)
+            free = list(segments)
+            running = {}
+            while True:
+                # Keep every buffer busy
+                while free:
+                    job = next(queue, None)
+                    if job is None:
+                        break
+                    segment = free.pop()
+                    scaled_size = (shapes[job[0]][1], shapes[job[0]][0])
+                    future = pool.submit(render_into, job[0], segment.name, shapes[job[0]],
+                                         scaled_size, sigma_ratio)
+                    running[future] = (job, segment)
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    (sidecar, mtime, label_path), segment = running.pop(future)
+                    data = None
+                    # Write beside the target, fsync and swap, a crash never leaves half a file
+                    temp = label_path + '.tmp'
+                    try:
+                        source, annotation, render_time = future.result()
+                        write_start = time.perf_counter()
+                        data = np.ndarray(shapes[sidecar], dtype=np.float32, buffer=segment.buf)
+                        write_label(temp, data, CHANNELS, source_sha256=source['sha256'],
+                                    source_name=source['name'], quality_dtype=quality_dtype,
+                                    annotation=annotation)
+                        sync_file(temp)
+                        os.replace(temp, label_path)
+                        write_time = time.perf_counter() - write_start
+                    except Exception as e:
+                        failed += 1
+                        log(f"Failed {sidecar}: {e}")
+                        continue
+                    finally:
+                        data = None  # Drop the view before the buffer is reused or closed
+                        free.append(segment)
+                        if os.path.exists(temp):
+                            os.remove(temp)  # Failed or interrupted write
+
+                    done += 1
+                    render_times.append(render_time)
+                    write_times.append(write_time)
+                    folder = os.path.dirname(label_path)
+                    if folder not in journal_files:
+                        journal_files[folder] = open(os.path.join(folder, JOURNAL_NAME), 'a',
+                                                     encoding='utf-8')
+                    journal = journal_files[folder]
+                    journal.write(json.dumps({
+                        'sidecar': sidecar, 'mtime': mtime, 'settings': settings,
+                        'label': label_path, 'render_ms': round(render_time * 1000, 3),
+                        'write_ms': round(write_time * 1000, 3)}) + '\n')
+                    journal.flush()
+
+                now = time.perf_counter()
+                if now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    rate = done / (now - start)
+                    remaining = (total - done - failed) / rate if rate else 0
+                    log(f"[{done + failed}/{total}] {100 * (done + failed) / total:.1f}%, "
+                        f"{rate:.1f} labels/s, ETA {_duration(remaining)}, {failed} failed")
+    finally:
+        for journal in journal_files.values():
+            journal.close()
+        for folder in journal_files:
+            sync_file(folder)
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    elapsed = time.perf_counter() - start
+    log(f"{done} regenerated, {skipped} skipped, {failed} failed in {_duration(elapsed)} "
+        f"({done / elapsed:.1f} labels/s with {workers} workers)")
+    if render_times:
+        log(f"  render (worker): {_percentiles(render_times)}")
+        log(f"  write (main):    {_percentiles(write_times)}")
+    return done, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Rebuild label files from grasp sidecars in parallel, resumably')
+    parser.add_argument('paths', nargs='+',
+                        help='dataset folders, labels/ folders or .grasps.json files')
+    resolution = parser.add_mutually_exclusive_group()
+    resolution.add_argument('--scale', type=float,
+                            help='output size relative to the annotated image size')
+    resolution.add_argument('--size', type=parse_image_size,
+                            help='output size as WIDTHxHEIGHT')
+    parser.add_argument('--sigma-ratio', type=float,
+                        help='Gaussian sigma over grasp width (default: as saved)')
+    parser.add_argument('--quality', choices=('uint8', 'float16'),
+                        help='store the payload compressed (default: float32, memory-mappable)')
+    parser.add_argument('--output', help='folder for the label files (default: beside each sidecar)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--restart', action='store_true',
+                        help=f'ignore {JOURNAL_NAME} and regenerate everything')
+    args = parser.parse_args(argv)
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    try:
+        _, _, failed = regenerate(args.paths, args.output, args.scale, args.size,
+                                  args.sigma_ratio, args.quality, args.workers, args.restart)
+    except KeyboardInterrupt:
+        print("Interrupted, run the same command again to resume", file=sys.stderr)
+        return 130
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Pack image and label pairs of a dataset into large sequential shards
+
+    python -m GraspCore.LabelShards DATASET OUTPUT [--shard-size 2G] [--workers N]
+
+Each shard is a plain concatenation of image files and label files, every
+record starting on a HEADER_ALIGN boundary so label payloads stay aligned.
+OUTPUT/index.npy holds one row per image: shard number, offsets and sizes.
+Running the command again packs only new or re-saved labels into new
+shards and rewrites the index; older copies become unreferenced bytes.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from GraspCore.LabelCodec import decode_payload
+from GraspCore.LabelDataset import index_source_images
+from GraspCore.LabelFile import HEADER_ALIGN, LABEL_EXTENSION, decode_header, label_channel
+
+
+INDEX_FILE = 'index.npy'
+SHARD_NAME = 'shard-{:05d}.bin'
+DEFAULT_SHARD_SIZE = 2 << 30  # 2 GiB
+
+_INDEX_FIELDS = [
+    ('shard', np.uint32),
+    ('image_offset', np.uint64),
+    ('image_size', np.uint64),
+    ('label_offset', np.uint64),
+    ('label_size', np.uint64),
+    ('label_mtime', np.int64),  # Label file mtime_ns when packed, to spot re-saved labels
+]
+
+
+def index_dtype(name_length, image_name_length) -> np.dtype:
+    return np.dtype([('name', f'U{max(1, name_length)}'),
+                     ('image_name', f'U{max(1, image_name_length)}')] + _INDEX_FIELDS)
+
+
+def parse_size(text) -> int:
+    """Byte count from text such as '512M' or '2G'"""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def read_index(output) -> np.ndarray:
+    path = os.path.join(output, INDEX_FILE)
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=index_dtype(1, 1))
+    return np.load(path)
+
+
+def write_index(output, index) -> None:
+    """Replace the index atomically, readers see the old or the new one"""
+    path = os.path.join(output, INDEX_FILE)
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, index)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def pack_shard(shard_path, items):
+    """
+    Write (name, image path, label path) items into one shard
+    Returns (name, image name, image offset, image size, label offset,
+    label size, label mtime) per item.
+    """
+    entries = []
+    with open(shard_path, 'wb') as shard:
+        for name, image_path, label_path in items:
+            row = [name, os.path.basename(image_path)]
+            for path in (image_path, label_path):
+                padding = -shard.tell() % HEADER_ALIGN
+                shard.write(b'\0' * padding)
+                offset = shard.tell()
+                with open(path, 'rb') as f:
+                    data = f.read()
+                shard.write(data)
+                row.extend((offset, len(data)))
+            row.append(os.stat(label_path).st_mtime_ns)
+            entries.append(tuple(row))
+        shard.flush()
+        os.fsync(shard.fileno())
+    return entries
+
+
+def _pack_job(job):
+    return pack_shard(*job)
+
+
+def plan_shards(items, sizes, shard_size):
+    """Split items into consecutive groups of about shard_size bytes"""
+    groups, current, total = [], [], 0
+    for item, size in zip(items, sizes):
+        if current and total + size > shard_size:
+            groups.append(current)
+            current, total = [], 0
+        current.append(item)
+        total += size + 2 * HEADER_ALIGN
+    if current:
+        groups.append(current)
+    return groups
+
+
+def pack_dataset(dataset, output, shard_size=DEFAULT_SHARD_SIZE, workers=None, log=print):
+    """
+    Pack new and re-saved labels of dataset/labels/ with their images into
+    new shards under output, then rewrite the index; returns the index
+    """
+    label_folder = os.path.join(dataset, 'labels')
+    if not os.path.isdir(label_folder):
+        raise FileNotFoundError(f"{dataset} has no labels/ folder")
+    os.makedirs(output, exist_ok=True)
+    index = read_index(output)
+    packed = {name: mtime for name, mtime in zip(index['name'].tolist(),
+                                                  index['label_mtime'].tolist())}
+
+    images = index_source_images(dataset)
+    items, sizes, missing = [], [], 0
+    for entry in sorted(os.scandir(label_folder), key=lambda e: e.name):
+        if not entry.name.endswith(LABEL_EXTENSION):
+            continue
+        name = entry.name[:-len(LABEL_EXTENSION)]
+        stat = entry.stat()
+        if packed.get(name) == stat.st_mtime_ns:
+            continue  # Already packed and not saved again since
+        if name not in images:
+            missing += 1
+            log(f"No source image for {entry.path}, skipped")
+            continue
+        items.append((name, images[name], entry.path))
+        sizes.append(stat.st_size + os.path.getsize(images[name]))
+
+    first_shard = int(index['shard'].max()) + 1 if len(index) else 0
+    groups = plan_shards(items, sizes, shard_size)
+    jobs = [(os.path.join(output, SHARD_NAME.format(first_shard + i)), group)
+            for i, group in enumerate(groups)]
+
+    entries = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers or os.cpu_count(), len(jobs)))) as pool:
+            for i, shard_entries in enumerate(pool.map(_pack_job, jobs)):
+                entries.extend((first_shard + i, entry) for entry in shard_entries)
+
+    # Re-saved labels replace their old rows, everything else is kept
+    rows = [entry[:2] + (shard,) + entry[2:] for shard, entry in entries]
+    kept = index[~np.isin(index['name'], [row[0] for row in rows])]
+    names = kept['name'].tolist() + [row[0] for row in rows]
+    image_names = kept['image_name'].tolist() + [row[1] for row in rows]
+    dtype = index_dtype(max(map(len, names), default=1), max(map(len, image_names), default=1))
+    merged = np.concatenate([kept.astype(dtype), np.array(rows, dtype=dtype)])
+    merged = merged[np.lexsort((merged['image_offset'], merged['shard']))]
+    write_index(output, merged)
+    log(f"Packed {len(entries)} labels into {len(jobs)} new shards, "
+        f"{len(merged)} in index, {missing} without source image")
+    return merged
+
+
+class ShardDataset():
+    """
+    Read-only access to packed shards through one memmap per shard
+    Images come back as memoryviews and label payloads as array views of
+    the shard mapping, so reads never open or stat per-image files.
+    Iteration follows shard order, which keeps reads sequential.
+    """
+
+    def __init__(self, output) -> None:
+        self.output = output
+        self.index = read_index(output)
+        self.names = self.index['name'].tolist()
+        self._rows = {name: row for row, name in enumerate(self.names)}
+        self._shards = {}  # shard number -> uint8 memmap
+        self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shards'] = {}  # Mappings do not travel, reopen on demand
+        return state
+
+    def image_bytes(self, name):
+        """Encoded image file contents as a memoryview of the shard"""
+        entry = self.index[self._rows[name]]
+        start = int(entry['image_offset'])
+        return memoryview(self._shard(int(entry['shard'])))[start:start + int(entry['image_size'])]
+
+    def label(self, name):
+        """(header, (H, W, C) read-only payload view) of one label, decoded if encoded"""
+        entry = self.index[self._rows[name]]
+        shard = self._shard(int(entry['shard']))
+        start = int(entry['label_offset'])
+        record = shard[start:start + int(entry['label_size'])]
+        header = decode_header(record, name)
+        if 'encoding' in header:
+            payload = decode_payload(header['encoding'], tuple(header['shape']),
+                                     header['channels'], record[header['offset']:])
+            payload.flags.writeable = False
+            return header, payload
+        payload = record[header['offset']:].view(np.dtype(header['dtype']))
+        return header, payload.reshape(header['shape'])
+
+    def channel(self, name, channel):
+        """(H, W) view of one named label channel"""
+        header, payload = self.label(name)
+        return label_channel(payload, header, channel)
+
+    def _shard(self, number):
+        if os.getpid() != self._pid:
+            self._shards = {}  # Forked copy, map the shards again in this process
+            self._pid = os.getpid()
+        if number not in self._shards:
+            self._shards[number] = np.memmap(
+                os.path.join(self.output, SHARD_NAME.format(number)), dtype=np.uint8, mode='r')
+        return self._shards[number]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Pack images and labels of a dataset folder into sequential shards')
+    parser.add_argument('dataset', help='folder containing labels/ and image folders')
+    parser.add_argument('output', help='folder for shards and index.npy')
+    parser.add_argument('--shard-size', type=parse_size, default=DEFAULT_SHARD_SIZE,
+                        help='target shard size, e.g. 512M or 2G (default: 2G)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        pack_dataset(args.dataset, args.output, args.shard_size, args.workers)
+    except FileNotFoundError as e:
+        print(f"Packing failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Done in {time.perf_counter() - start:.2f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Vector grasp annotations saved beside each label
+
+Every save writes labels/<name>.grasps.json next to labels/<name>.glabel:
+the grasp rows (center, angle, length, width ratio) and fine-tune brush
+strokes in the coordinates they were annotated in, plus the size of that
+image. That is enough to rasterize the maps again at any resolution or
+Gaussian sigma; python -m GraspCore.LabelRegenerate does so in batch.
+
+Each save gives the sidecar and the label header's 'annotation' the same
+'save_id'. LabelWriter swaps the sidecar in before the label, so a crash
+between the two leaves a sidecar newer than its label, never an older one;
+label_matches_sidecar() tells the two cases apart.
+"""
+import json
+import os
+
+import numpy as np
+
+from GraspCore.GraspSet import GRASP_DTYPE, GraspSet
+from GraspCore.Heatmap import SIGMA_RATIO, HeatmapLayers, rasterize_grasps
+from GraspCore.LabelFile import CHANNELS, LABEL_EXTENSION, LabelFormatError
+
+
+SIDECAR_EXTENSION = '.grasps.json'
+SIDECAR_VERSION = 1
+GRASP_FIELDS = ('id', 'center_x', 'center_y', 'angle', 'length', 'width_ratio')
+STROKE_FIELDS = ('x', 'y', 'radius', 'delta')
+
+
+def sidecar_path(label_path) -> str:
+    """Sidecar path belonging to a label file path"""
+    base = label_path[:-len(LABEL_EXTENSION)] if label_path.endswith(LABEL_EXTENSION) else label_path
+    return base + SIDECAR_EXTENSION
+
+
+def write_sidecar(path, grasps, strokes, size, source_name=None, source_sha256=None,
+                  sigma_ratio=SIGMA_RATIO, save_id=None) -> int:
+    """
+    Write grasps and (x, y, radius, delta) brush strokes as a sidecar
+    size: (width, height) of the image the coordinates refer to
+    save_id: identifier shared with the label written in the same save
+    Returns the file size. Floats are written exactly, unmarked widths as null.
+    """
+    data = grasps.data
+    rows = [[grasp_id, x, y, angle, length, None if ratio != ratio else ratio]
+            for grasp_id, (x, y), angle, length, ratio in zip(
+                data['id'].tolist(), data['center'].tolist(), data['angle'].tolist(),
+                data['length'].tolist(), data['width_ratio'].tolist())]
+    sidecar = {
+        'version': SIDECAR_VERSION,
+        'source': {'name': source_name, 'sha256': source_sha256,
+                   'width': int(size[0]), 'height': int(size[1])},
+        'sigma_ratio': sigma_ratio,
+        'grasp_fields': list(GRASP_FIELDS),
+        'grasps': rows,
+        'stroke_fields': list(STROKE_FIELDS),
+        'strokes': [[float(value) for value in stroke] for stroke in strokes],
+    }
+    if save_id is not None:
+        sidecar['save_id'] = save_id
+    text = json.dumps(sidecar, separators=(',', ':'), allow_nan=False).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(text)
+    return len(text)
+
+
+def read_sidecar(path):
+    """(GraspSet, strokes, sidecar dictionary) of one sidecar file"""
+    try:
+        with open(path, 'rb') as f:
+            sidecar = json.loads(f.read().decode('utf-8'))
+    except ValueError as e:
+        raise LabelFormatError(f"{path} is not a grasp sidecar: {e}") from None
+    if not isinstance(sidecar, dict) or 'grasps' not in sidecar:
+        raise LabelFormatError(f"{path} is not a grasp sidecar")
+    if sidecar.get('version', 0) > SIDECAR_VERSION:
+        raise LabelFormatError(f"{path} has sidecar version {sidecar['version']}, "
+                               f"newest supported is {SIDECAR_VERSION}")
+
+    fields = sidecar.get('grasp_fields', GRASP_FIELDS)
+    columns = [fields.index(name) for name in GRASP_FIELDS]
+    array = np.zeros(len(sidecar['grasps']), dtype=GRASP_DTYPE)
+    if len(array):
+        values = np.array([[np.nan if row[i] is None else row[i] for i in columns]
+                           for row in sidecar['grasps']], dtype=np.float64)
+        array['id'] = values[:, 0]
+        array['center'] = values[:, 1:3]
+        array['angle'] = values[:, 3]
+        array['length'] = values[:, 4]
+        array['width_ratio'] = values[:, 5]
+
+    fields = sidecar.get('stroke_fields', STROKE_FIELDS)
+    columns = [fields.index(name) for name in STROKE_FIELDS]
+    strokes = [tuple(stroke[i] for i in columns) for stroke in sidecar.get('strokes', [])]
+    return GraspSet.from_array(array), strokes, sidecar
+
+
+def label_matches_sidecar(header, sidecar) -> bool:
+    """
+    Whether a label header and a sidecar dictionary come from the same save
+    False means the save was interrupted after the sidecar was swapped in:
+    the sidecar holds the newer annotations. Files written before save ids
+    existed are taken to match.
+    """
+    label_id = header.get('annotation', {}).get('save_id')
+    sidecar_id = sidecar.get('save_id')
+    return label_id is None or sidecar_id is None or label_id == sidecar_id
+
+
+def output_size(sidecar, scale=None, size=None):
+    """Map (width, height) for a sidecar dictionary: size, scaled or as annotated"""
+    if size is not None:
+        return tuple(size)
+    source = sidecar['source']
+    if scale is None:
+        return source['width'], source['height']
+    return max(1, round(source['width'] * scale)), max(1, round(source['height'] * scale))
+
+
+def render_sidecar(path, size=None, sigma_ratio=None, out=None):
+    """
+    Rasterize the maps of one sidecar
+    size: output (width, height), defaults to the annotated image size
+    sigma_ratio: Gaussian sigma over grasp width, defaults to the saved one
+    out: optional (H, W, C) float32 array to write into
+    Returns ((H, W, C) float32 array in CHANNELS order, sidecar dictionary).
+    At the default size and sigma the result equals what the tool saved.
+    """
+    grasps, strokes, sidecar = read_sidecar(path)
+    source = sidecar['source']
+    width, height = output_size(sidecar, size=size)
+    if sigma_ratio is None:
+        sigma_ratio = sidecar.get('sigma_ratio', SIGMA_RATIO)
+
+    data = out if out is not None else np.empty((height, width, len(CHANNELS)), dtype=np.float32)
+    rasterize_grasps(grasps, (height, width), width / source['width'], height / source['height'],
+                     sigma_ratio, strokes, out=tuple(data[:, :, CHANNELS.index(name)]
+                                                     for name in HeatmapLayers.MAP_NAMES))
+    return data, sidecar
+
+
+def find_sidecars(path):
+    """Sidecar files of a dataset folder, a labels/ folder or a single sidecar"""
+    if not os.path.isdir(path):
+        return [path]
+    labels = os.path.join(path, 'labels')
+    folder = labels if os.path.isdir(labels) else path
+    return sorted(entry.path for entry in os.scandir(folder)
+                  if entry.name.endswith(SIDECAR_EXTENSION))
@@ -0,0 +1,125 @@
+import itertools
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from GraspCore.GraspSet import GraspSet
+from GraspCore.Heatmap import SIGMA_RATIO, HeatmapLayers, rasterize_grasps
+from GraspCore.LabelFile import CHANNELS, create_label, file_sha256, write_label
+from GraspCore.LabelSidecar import sidecar_path, write_sidecar
+from GraspCore.Tracing import traced, tracer
+
+
+def sync_file(path) -> None:
+    """fsync a file, or a folder entry list where the platform allows it"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # Folders cannot be opened on Windows
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def render_label(path, grasps, strokes, size, quality_dtype=None, source_path=None,
+                 source_sha256=None, sigma_ratio=SIGMA_RATIO, save_id=None) -> int:
+    """
+    Rasterize grasps and brush strokes at size (width, height) into a label
+    file; dense payloads are rasterized straight into the file mapping.
+    Returns the file size.
+    """
+    width, height = size
+    shape = (height, width, len(CHANNELS))
+    annotation = {'grasps': len(grasps)}
+    if save_id is not None:
+        annotation['save_id'] = save_id
+    if quality_dtype is None:
+        data = create_label(path, shape, CHANNELS, source_path=source_path,
+                            source_sha256=source_sha256, annotation=annotation)
+    else:
+        data = np.empty(shape, dtype=np.float32)  # Encoding needs the whole dense array first
+    rasterize_grasps(grasps, (height, width), sigma_ratio=sigma_ratio, strokes=strokes,
+                     out=tuple(data[:, :, CHANNELS.index(name)] for name in HeatmapLayers.MAP_NAMES))
+    if quality_dtype is None:
+        data.flush()
+        del data
+        return os.path.getsize(path)
+    return write_label(path, data, CHANNELS, source_path=source_path,
+                       source_sha256=source_sha256, quality_dtype=quality_dtype,
+                       annotation=annotation)
+
+
+class LabelWriter():
+    """
+    Background writer for label files and their sidecars
+    save() takes a snapshot of the annotations (grasp rows and the stroke
+    list, no maps) and returns a Future at once; a thread pool hashes the
+    source image, rasterizes and writes. Every file is written to a temp
+    name, fsynced and renamed over the target, so readers and crashes only
+    ever see a complete old or new file. The sidecar is renamed first and
+    the label second, both carrying the same save id: a crash in between
+    leaves a label older than its sidecar, which label_matches_sidecar()
+    detects and LabelRegenerate repairs. Saves of the same label can
+    overlap; one that finishes after a newer save was committed is dropped.
+    """
+
+    def __init__(self, workers=2) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='label-writer')
+        self._lock = threading.Lock()
+        self._serial = itertools.count(1)
+        self._committed = {}  # label path -> serial of the newest committed save
+
+    def save(self, label_path, source_path, grasps, strokes, size,
+             quality_dtype=None, sigma_ratio=SIGMA_RATIO):
+        """
+        Queue one save, returns a Future of (label path, file size, superseded)
+        grasps: GraspSet, copied here; strokes: (x, y, radius, delta) tuples
+        size: (width, height) of the image the coordinates refer to
+        """
+        snapshot = GraspSet.from_array(grasps.to_array())
+        return self._pool.submit(self._write, next(self._serial), label_path, source_path,
+                                 snapshot, tuple(strokes), size, quality_dtype, sigma_ratio)
+
+    def shutdown(self, wait=True):
+        """Stop accepting saves; by default wait for queued ones to finish"""
+        self._pool.shutdown(wait=wait)
+
+    @traced('write_label')
+    def _write(self, serial, label_path, source_path, grasps, strokes, size,
+               quality_dtype, sigma_ratio):
+        os.makedirs(os.path.dirname(label_path), exist_ok=True)
+        with tracer.span('hash_source'):
+            source_sha256 = file_sha256(source_path)
+        targets = (label_path, sidecar_path(label_path))
+        temps = tuple(f"{path}.{os.getpid()}-{serial}.tmp" for path in targets)
+        save_id = uuid.uuid4().hex
+        try:
+            with tracer.span('render_label', grasps=len(grasps)):
+                file_size = render_label(temps[0], grasps, strokes, size, quality_dtype,
+                                         source_path, source_sha256, sigma_ratio, save_id)
+            write_sidecar(temps[1], grasps, strokes, size, os.path.basename(source_path),
+                          source_sha256, sigma_ratio, save_id)
+            with tracer.span('fsync'):
+                for temp in temps:
+                    sync_file(temp)
+
+            with self._lock:
+                superseded = self._committed.get(label_path, 0) > serial
+                if not superseded:
+                    # Sidecar first, so an interrupted save leaves the newer annotations
+                    os.replace(temps[1], targets[1])
+                    os.replace(temps[0], targets[0])
+                    self._committed[label_path] = serial
+            if not superseded:
+                sync_file(os.path.dirname(label_path))
+            return label_path, file_size, superseded
+        finally:
+            for temp in temps:
+                if os.path.exists(temp):
+                    os.remove(temp)
@@ -0,0 +1,106 @@
+import math
+
+
+def point_segment_distance(point, segment_start, segment_end) -> float:
+    """Calculate distance from point to line segment"""
+    px, py = point
+    x1, y1 = segment_start
+    x2, y2 = segment_end
+
+    # Calculate square of line segment length
+    l2 = (x2 - x1) ** 2 + (y2 - y1) ** 2
+    if l2 == 0:
+        # If line segment length is 0, return distance to endpoint
+        return math.sqrt((px - x1) ** 2 + (py - y1) ** 2)
+
+    # Projection parameter t of the point, clamped to the segment
+    t = max(0, min(1, ((px - x1) * (x2 - x1) + (py - y1) * (y2 - y1)) / l2))
+    proj_x = x1 + t * (x2 - x1)
+    proj_y = y1 + t * (y2 - y1)
+    return math.sqrt((px - proj_x) ** 2 + (py - proj_y) ** 2)
+
+
+class SegmentGrid():
+    """
+    Uniform grid for nearest-segment queries
+    Each segment is registered in every cell it passes through, so a query
+    only measures segments in the few cells around the point.
+    """
+
+    def __init__(self, cell_size=32) -> None:
+        self.cell_size = cell_size
+        self._cells = {}     # (cx, cy) -> set of keys
+        self._segments = {}  # key -> (start, end, value, order)
+        self._next_order = 0
+
+    def __len__(self):
+        return len(self._segments)
+
+    def clear(self):
+        self._cells.clear()
+        self._segments.clear()
+        self._next_order = 0
+
+    def insert(self, key, start, end, value=None):
+        """Add a segment, or move an existing one keeping its insertion order"""
+        order = self._next_order
+        if key in self._segments:
+            order = self._segments[key][3]
+            self._unlink(key)
+        else:
+            self._next_order += 1
+        self._segments[key] = (start, end, value, order)
+        for cell in self._cells_for_segment(start, end):
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        if key in self._segments:
+            self._unlink(key)
+            del self._segments[key]
+
+    def nearest(self, point, tolerance):
+        """
+        Value of the nearest segment within tolerance of point, or None
+        Ties go to the segment inserted first, like a linear scan would.
+        """
+        candidates = set()
+        for cell in self._cells_for_box(point[0] - tolerance, point[1] - tolerance,
+                                        point[0] + tolerance, point[1] + tolerance):
+            candidates.update(self._cells.get(cell, ()))
+
+        best = None
+        for key in candidates:
+            start, end, value, order = self._segments[key]
+            distance = point_segment_distance(point, start, end)
+            if distance <= tolerance and (best is None or (distance, order) < best[:2]):
+                best = (distance, order, value)
+        return best[2] if best else None
+
+    def _unlink(self, key):
+        start, end = self._segments[key][:2]
+        for cell in self._cells_for_segment(start, end):
+            keys = self._cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._cells[cell]
+
+    def _cells_for_box(self, x0, y0, x1, y1):
+        size = self.cell_size
+        for cx in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            for cy in range(math.floor(y0 / size), math.floor(y1 / size) + 1):
+                yield cx, cy
+
+    def _cells_for_segment(self, start, end):
+        size = self.cell_size
+        (x0, y0), (x1, y1) = sorted((tuple(start), tuple(end)))
+        # Walk the cell columns, taking the y extent of the segment in each
+        for cx in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            if x1 == x0:
+                ya, yb = y0, y1
+            else:
+                slope = (y1 - y0) / (x1 - x0)
+                ya = y0 + (max(x0, cx * size) - x0) * slope
+                yb = y0 + (min(x1, (cx + 1) * size) - x0) * slope
+            for cy in range(math.floor(min(ya, yb) / size), math.floor(max(ya, yb) / size) + 1):
+                yield cx, cy
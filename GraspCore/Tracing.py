@@ -0,0 +1,146 @@
+"""
+Named timing spans with Chrome trace export
+
+    from GraspCore.Tracing import traced, tracer
+
+    @traced()
+    def generate_heatmaps(self): ...
+
+    with tracer.span('decode', path=path): ...
+
+Tracing is off until tracer.enable(); a disabled span is one attribute
+check and a shared no-op context manager. Enabled spans are kept as
+complete ("X") events for write_chrome_trace(), which chrome://tracing and
+Perfetto open, and the last ROLLING_WINDOW durations of every span name
+feed summary(). Spans may be opened from any thread.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+
+MAX_EVENTS = 200000  # Oldest events are dropped beyond this
+ROLLING_WINDOW = 100  # Durations per span name kept for summary()
+
+_NULL_SPAN = nullcontext()
+
+
+class _Span():
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
+
+
+class Tracer():
+    """Collects spans while enabled, see the module docstring"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=MAX_EVENTS)  # (name, start ns, duration ns, thread id, args)
+        self._durations = {}  # span name -> deque of recent durations in ns
+        self._thread_names = {}  # thread id -> name
+        self._origin = time.perf_counter_ns()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._durations.clear()
+            self._thread_names.clear()
+            self._origin = time.perf_counter_ns()
+
+    def span(self, name, **args):
+        """Context manager timing the block under name; args end up in the trace"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def record(self, name, start_ns, duration_ns, args=None):
+        thread = threading.current_thread()
+        with self._lock:
+            self._events.append((name, start_ns, duration_ns, thread.ident, args))
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = deque(maxlen=ROLLING_WINDOW)
+            durations.append(duration_ns)
+            if thread.ident not in self._thread_names:
+                self._thread_names[thread.ident] = thread.name
+
+    def summary(self):
+        """[(span name, count, p50 ms, p95 ms, max ms)] over the recent durations, by name"""
+        with self._lock:
+            durations = {name: list(values) for name, values in self._durations.items()}
+        rows = []
+        for name in sorted(durations):
+            values = np.asarray(durations[name]) / 1e6
+            rows.append((name, len(values), float(np.percentile(values, 50)),
+                         float(np.percentile(values, 95)), float(values.max())))
+        return rows
+
+    def chrome_trace(self) -> dict:
+        """Recorded spans as a Chrome trace_event document"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+            origin = self._origin
+        trace_events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                         'args': {'name': name}} for tid, name in thread_names.items()]
+        for name, start, duration, tid, args in events:
+            event = {'name': name, 'cat': 'ui', 'ph': 'X', 'pid': pid, 'tid': tid,
+                     'ts': (start - origin) / 1000, 'dur': duration / 1000}
+            if args:
+                event['args'] = {key: str(value) for key, value in args.items()}
+            trace_events.append(event)
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        """Write the recorded spans as Chrome trace_event JSON, returns the event count"""
+        trace = self.chrome_trace()
+        temp = path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        os.replace(temp, path)
+        return len(trace['traceEvents'])
+
+
+tracer = Tracer()  # Shared by the whole process
+
+
+def traced(name=None):
+    """
+    Decorator timing every call of a function as a span
+    The wrapper passes arguments through as given, so do not use it on
+    slots connected to signals with more arguments than the slot takes.
+    """
+    def decorate(function):
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with _Span(tracer, span_name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,7 @@
+"""
+Annotation core shared by the GUI and the batch tools
+
+Grasp storage and geometry, heatmap rasterization, colormaps and the label
+file formats, on NumPy alone. Nothing here imports Qt, so worker processes
+and scripts can use it without a display; QtPage only calls into it.
+"""
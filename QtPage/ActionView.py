@@ -1,13 +1,22 @@
 from PyQt5.QtWidgets import (QMainWindow, QHBoxLayout, QVBoxLayout, QWidget,
                              QFileDialog, QListWidget, QPushButton, QLabel,
-                             QGroupBox, QSlider, QMessageBox)
-from PyQt5.QtCore import Qt
-import os
-import cv2
-import numpy as np
+                             QGroupBox, QSlider, QMessageBox, QComboBox, QCheckBox)
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+from GraspCore.LabelDataset import label_path_for_image
+from GraspCore.LabelFile import dense_label_size
+from GraspCore.LabelWriter import LabelWriter
+from GraspCore.Tracing import traced, tracer
+
+
+class SaveReporter(QObject):
+    # Emitted from writer threads, delivered on the GUI thread
+    finished = pyqtSignal(str, object, int)
 
 
 class ActionView():
+    TRACE_SUMMARY_HEIGHT = 180
+    TRACE_SUMMARY_INTERVAL = 1000  # ms between summary refreshes while tracing
+
     def __init__(self, show_view_instance) -> None:
         # Save reference to ShowView instance
         self.show_view = show_view_instance
@@ -84,12 +93,34 @@ class ActionView():
         fine_tune_buttons.addWidget(self.fine_up_button)
         fine_tune_buttons.addWidget(self.fine_down_button)
 
+        # Brush radius slider (image pixels)
+        self.fine_radius_slider = QSlider(Qt.Horizontal)
+        self.fine_radius_slider.setFixedWidth(200)
+        self.fine_radius_slider.setTickPosition(QSlider.TicksBelow)
+        self.fine_radius_slider.setMinimum(2)
+        self.fine_radius_slider.setMaximum(100)
+        self.fine_radius_slider.setValue(self.show_view.fine_tune_radius)
+        self.fine_radius_slider.setTickInterval(10)
+        self.fine_radius_slider.valueChanged.connect(
+            lambda value: self.show_view.set_fine_tune_radius(value))
+
         self.action_layout.addWidget(fine_text)
         self.action_layout.addLayout(fine_tune_buttons)
+        self.action_layout.addWidget(self.fine_radius_slider)
         self.action_layout.setAlignment(fine_tune_buttons, Qt.AlignCenter)
+        self.action_layout.setAlignment(self.fine_radius_slider, Qt.AlignCenter)
 
         self.action_layout.addSpacing(20)
 
+        # Label storage: dense float32, or compressed with quantized quality
+        self.storage_combo = QComboBox()
+        self.storage_combo.setFixedWidth(200)
+        self.storage_combo.addItem("Float32 (memory-mappable)", None)
+        self.storage_combo.addItem("Compressed, uint8 quality", 'uint8')
+        self.storage_combo.addItem("Compressed, float16 quality", 'float16')
+        self.action_layout.addWidget(self.storage_combo)
+        self.action_layout.setAlignment(self.storage_combo, Qt.AlignCenter)
+
         self.save_button = QPushButton("Save")
         self.save_button.setFixedWidth(200)
         self.save_button.clicked.connect(
@@ -97,6 +128,11 @@ class ActionView():
         self.action_layout.addWidget(self.save_button)
         self.action_layout.setAlignment(self.save_button, Qt.AlignCenter)
 
+        # Saves run on writer threads and report back through Qt signals
+        self.label_writer = LabelWriter()
+        self.save_reporter = SaveReporter()
+        self.save_reporter.finished.connect(self.on_save_finished)
+
         self.action_groupbox.setLayout(self.action_layout)
 
         # Output
@@ -121,6 +157,33 @@ class ActionView():
         """)
 
         self.output_layout.addWidget(self.output_list)
+
+        # Tracing: span timings of the UI actions, summarized below the list
+        self.trace_checkbox = QCheckBox("Trace")
+        self.trace_checkbox.setFixedWidth(95)
+        self.trace_checkbox.setToolTip("Time image display, preview, brush and save steps")
+        self.trace_checkbox.toggled.connect(self.set_tracing)
+        self.trace_export_button = QPushButton("Export")
+        self.trace_export_button.setFixedWidth(95)
+        self.trace_export_button.setToolTip("Save the recorded spans as Chrome trace JSON")
+        self.trace_export_button.clicked.connect(self.handle_export_trace)
+        trace_controls = QHBoxLayout()
+        trace_controls.addWidget(self.trace_checkbox)
+        trace_controls.addWidget(self.trace_export_button)
+        self.output_layout.addLayout(trace_controls)
+
+        self.trace_summary = QLabel()
+        self.trace_summary.setFixedWidth(200)
+        self.trace_summary.setFixedHeight(self.TRACE_SUMMARY_HEIGHT)
+        self.trace_summary.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        summary_font = self.trace_summary.font()
+        summary_font.setPointSize(7)
+        self.trace_summary.setFont(summary_font)
+        self.trace_summary.setToolTip("Recent span latencies per action: median / 95th percentile")
+        self.trace_summary.hide()
+        self.output_layout.addWidget(self.trace_summary)
+        self.trace_timer = QTimer()
+        self.trace_timer.timeout.connect(self.update_trace_summary)
         self.output_groupbox.setLayout(self.output_layout)
 
         # Add to Layout
@@ -159,6 +222,7 @@ class ActionView():
         self.fine_up_button.setStyleSheet(self.normal_style)
         self.fine_down_button.setStyleSheet(self.normal_style)
         self.save_button.setStyleSheet(self.normal_style)
+        self.trace_export_button.setStyleSheet(self.normal_style)
 
     def check_image_loaded(self, callback_function):
         """Check if an image has been loaded - general method"""
@@ -183,7 +247,7 @@ class ActionView():
 
     def handle_slider_change(self):
         """Handle slider value change logic"""
-        if not self.show_view.current_grasp_line:
+        if self.show_view.current_grasp_id is None:
             return
 
         value = self.mark_slider.value()
@@ -195,7 +259,7 @@ class ActionView():
     def handle_mark(self):
         """Handle Mark button click logic"""
         # Check if a select line has already been drawn
-        if not self.show_view.current_grasp_line:
+        if self.show_view.current_grasp_id is None:
             QMessageBox.warning(self.widget,
                                 "Warning",
                                 "Please draw a line using the select button first!",
@@ -216,7 +280,7 @@ class ActionView():
     def handle_generate(self):
         """Handle Generate button click logic"""
         # Check if there are labeled grasp lines
-        if not self.show_view.grasp_lines:
+        if not len(self.show_view.grasps):
             QMessageBox.warning(self.widget,
                                 "Warning",
                                 "Please complete the grasp axis selection and width marking first!",
@@ -254,6 +318,7 @@ class ActionView():
             self.fine_down_button.setStyleSheet(self.selected_style)
             self.fine_up_button.setStyleSheet(self.normal_style)
 
+    @traced()
     def handle_save(self):
         """处理保存按钮点击的逻辑"""
         if not self.show_view.quality_map is not None or \
@@ -274,79 +339,73 @@ class ActionView():
                                 QMessageBox.Ok)
             return
 
-        # Get original image size
-        original_height = self.show_view.current_pixmap.height()
-        original_width = self.show_view.current_pixmap.width()
-
-        # Create label folder
-        folder_path = os.path.dirname(
-            os.path.dirname(self.show_view.current_file_path))
-        label_folder = os.path.join(folder_path, 'labels')
-        if not os.path.exists(label_folder):
-            os.makedirs(label_folder)
-
-        # Get original file name (without extension)
-        base_name = os.path.splitext(os.path.basename(
-            self.show_view.current_file_path))[0]
-        save_path = os.path.join(label_folder, f"{base_name}.mat")
-
+        # labels/ next to the image folder, created by the writer
+        save_path = label_path_for_image(self.show_view.current_file_path)
+
+        # Hand a snapshot of the annotations to the background writer, which
+        # rasterizes at image size and writes label and sidecar atomically;
+        # the annotator can move to the next image right away
+        layers = self.show_view.heatmap_layers
+        size = (self.show_view.current_pixmap.width(), self.show_view.current_pixmap.height())
+        quality_dtype = self.storage_combo.currentData()
+        future = self.label_writer.save(save_path, self.show_view.current_file_path,
+                                        self.show_view.grasps, layers.strokes, size,
+                                        quality_dtype, layers.sigma_ratio)
+        dense_bytes = dense_label_size(*size)
+        future.add_done_callback(
+            lambda future: self.save_reporter.finished.emit(save_path, future, dense_bytes))
+
+        self.output_list.addItem(f"Saving: {save_path}")
+        self.output_list.scrollToBottom()
+
+    def on_save_finished(self, save_path, future, dense_bytes):
+        """Report a finished background save, runs on the GUI thread"""
         try:
-            # Resize heatmap to original image size
-            quality_resized = cv2.resize(self.show_view.quality_map,
-                                         (original_width, original_height),
-                                         interpolation=cv2.INTER_LINEAR)
-            width_resized = cv2.resize(self.show_view.width_map,
-                                       (original_width, original_height),
-                                       interpolation=cv2.INTER_LINEAR)
-            angle_resized = cv2.resize(self.show_view.angle_map,
-                                       (original_width, original_height),
-                                       interpolation=cv2.INTER_LINEAR)
-
-            combined_data = cv2.merge(
-                [quality_resized, width_resized, angle_resized])
-
-            # Save as .dat file
-            combined_data.tofile(save_path)
-
-            # Display save path in output box
-            self.output_list.addItem(f"Saved to: {save_path}")
-            # Scroll to latest item
-            self.output_list.scrollToBottom()
-
+            _, size, superseded = future.result()
         except Exception as e:
-            # Pop up error prompt
-            QMessageBox.critical(self.widget,
-                                 "Error",
-                                 f"Save failed: {str(e)}",
-                                 QMessageBox.Ok)
-
-            # Clear all annotations for current image
-            self.show_view.grasp_lines = []  # Clear grasp line information
-            self.show_view.current_grasp_line = None  # Clear current selected grasp line
-            self.show_view.quality_map = None  # Clear quality map
-            self.show_view.angle_map = None  # Clear angle map
-            self.show_view.width_map = None  # Clear width map
-            self.show_view.temp_pixmap = None  # Clear temporary image
-            self.show_view.is_drawing = False  # Reset drawing state
-            self.show_view.start_point = None  # Clear start point
-            self.show_view.end_point = None  # Clear end point
-            self.show_view.fine_tune_mode = None  # Reset fine-tuning mode
-
-            # Clear scale
-            self.show_view.colorbar_label.clear()
-            self.show_view.width_colorbar_label.clear()
-            self.show_view.angle_colorbar_label.clear()
-
-            # Clear label text
-            self.show_view.quality_label.setText("")
-            self.show_view.angle_label.setText("")
-            self.show_view.width_label.setText("")
-
-            # Reload original image
-            if self.show_view.current_pixmap:
-                self.show_view.origin_image.setPixmap(
-                    self.show_view.current_pixmap.scaled(640, 480, Qt.KeepAspectRatio))
-
             # Display error information in output box
-            self.output_list.addItem(f"Save failed: {str(e)}")
-            self.output_list.scrollToBottom()
+            self.output_list.addItem(f"Save failed: {save_path}: {str(e)}")
+        else:
+            if superseded:
+                self.output_list.addItem(f"Skipped, saved again since: {save_path}")
+            else:
+                note = ""
+                if size < dense_bytes:
+                    note = f" (compressed {dense_bytes / size:.1f}x, {size / 1024:.1f} KB)"
+                self.output_list.addItem(f"Saved to: {save_path}{note}")
+        # Scroll to latest item
+        self.output_list.scrollToBottom()
+
+    def set_tracing(self, enabled):
+        """Turn span recording on or off, the summary is shown while it is on"""
+        tracer.enable(enabled)
+        self.trace_summary.setVisible(enabled)
+        # Keep the panel height, the list gives up the summary's room
+        self.output_list.setFixedHeight(480 - self.TRACE_SUMMARY_HEIGHT if enabled else 480)
+        if enabled:
+            self.update_trace_summary()
+            self.trace_timer.start(self.TRACE_SUMMARY_INTERVAL)
+        else:
+            self.trace_timer.stop()
+
+    def update_trace_summary(self):
+        """Show median and 95th percentile latency of every traced span"""
+        rows = ["<tr><th align='left'>Span (ms)</th><th>p50</th><th>p95</th></tr>"]
+        for name, count, p50, p95, _ in tracer.summary():
+            rows.append(f"<tr><td>{name}</td><td align='right'>{p50:.1f}</td>"
+                        f"<td align='right'>{p95:.1f}</td></tr>")
+        self.trace_summary.setText(f"<table cellspacing='0' cellpadding='1'>{''.join(rows)}</table>")
+
+    def handle_export_trace(self):
+        """Write the recorded spans as Chrome trace JSON (chrome://tracing, Perfetto)"""
+        path, _ = QFileDialog.getSaveFileName(self.widget, "Export Trace", "trace.json",
+                                              "Chrome Trace (*.json)")
+        if not path:
+            return
+        try:
+            count = tracer.write_chrome_trace(path)
+        except OSError as e:
+            self.output_list.addItem(f"Trace export failed: {path}: {str(e)}")
+        else:
+            self.output_list.addItem(f"Trace written to: {path} ({count} events)")
+        self.output_list.scrollToBottom()
@@ -0,0 +1,191 @@
+import os
+import time
+from array import array
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from GraspCore.LabelDataset import label_path_for_image
+from GraspCore.LabelFile import LabelFormatError, read_label_header
+from GraspCore.LabelSidecar import read_sidecar, sidecar_path
+
+
+class PathList():
+    """
+    Append-only list of file paths stored as flat arrays
+    Names are kept as one encoded byte buffer with an offset per entry and
+    folders are stored once, so a million entries take a few tens of MB
+    instead of a Python string per row.
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def __len__(self):
+        return len(self._folder_rows)
+
+    def clear(self):
+        self._folders = []          # Distinct folder paths
+        self._folder_numbers = {}   # folder path -> index into _folders
+        self._folder_rows = array('i')  # Folder index per entry
+        self._names = bytearray()   # os.fsencode()d file names, back to back
+        self._offsets = array('q', [0])  # Entry i is _names[_offsets[i]:_offsets[i + 1]]
+
+    def extend_names(self, folder, names):
+        """Append file names that all live in folder"""
+        number = self._folder_numbers.get(folder)
+        if number is None:
+            number = self._folder_numbers[folder] = len(self._folders)
+            self._folders.append(folder)
+        offset = self._offsets[-1]
+        for name in names:
+            encoded = os.fsencode(name)
+            self._names += encoded
+            offset += len(encoded)
+            self._offsets.append(offset)
+        self._folder_rows.extend([number] * len(names))
+
+    def extend(self, paths):
+        """Append full paths, which may come from several folders"""
+        for path in paths:
+            self.extend_names(os.path.dirname(path), [os.path.basename(path)])
+
+    def name(self, row):
+        return os.fsdecode(bytes(self._names[self._offsets[row]:self._offsets[row + 1]]))
+
+    def path(self, row):
+        return os.path.join(self._folders[self._folder_rows[row]], self.name(row))
+
+
+class FileListModel(QAbstractTableModel):
+    """
+    File list with per-file label status, for a QTableView
+    Rows come from a PathList; status (annotated, grasp count, last saved)
+    is looked up only for rows the view asks about and cached, so the list
+    scales to folders of any size without per-row items or widgets.
+    """
+
+    COLUMNS = ("Name", "✓", "Grasps", "Saved")
+    NAME, ANNOTATED, GRASPS, SAVED = range(4)
+    MAX_CACHED_STATUS = 4096
+
+    def __init__(self, thumbnails=None, parent=None) -> None:
+        super().__init__(parent)
+        self.paths = PathList()
+        self._status = {}  # row -> (annotated, grasp count or None, saved time or None)
+        # Optional ThumbnailCache for the name column
+        self.thumbnails = thumbnails
+        self._thumbnail_rows = {}  # image path -> row waiting for its thumbnail
+        if thumbnails is not None:
+            thumbnails.thumbnail_ready.connect(self._thumbnailReady)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.ToolTipRole:
+            return self.paths.path(row)
+        if role == Qt.TextAlignmentRole and column != self.NAME:
+            return Qt.AlignCenter
+        if role == Qt.DecorationRole and column == self.NAME and self.thumbnails is not None:
+            path = self.paths.path(row)
+            pixmap = self.thumbnails.get(path)
+            if pixmap is None:
+                self._thumbnail_rows[path] = row
+            return pixmap
+        if role != Qt.DisplayRole:
+            return None
+
+        if column == self.NAME:
+            return self.paths.name(row)
+        annotated, grasp_count, saved = self.status(row)
+        if column == self.ANNOTATED:
+            return "✓" if annotated else ""
+        if column == self.GRASPS:
+            return "" if grasp_count is None else str(grasp_count)
+        return "" if saved is None else time.strftime("%m-%d %H:%M", time.localtime(saved))
+
+    def status(self, row):
+        """(annotated, grasp count or None, last saved timestamp or None) of one row"""
+        status = self._status.get(row)
+        if status is None:
+            if len(self._status) >= self.MAX_CACHED_STATUS:
+                self._status.clear()
+            status = self._status[row] = self._read_status(self.paths.path(row))
+        return status
+
+    def path(self, row):
+        return self.paths.path(row)
+
+    def name(self, row):
+        return self.paths.name(row)
+
+    def appendNames(self, folder, names):
+        if not names:
+            return
+        first = len(self.paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(names) - 1)
+        self.paths.extend_names(folder, names)
+        self.endInsertRows()
+
+    def appendPaths(self, paths):
+        if not paths:
+            return
+        first = len(self.paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+        self.paths.extend(paths)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.paths.clear()
+        self._status.clear()
+        self._thumbnail_rows.clear()
+        if self.thumbnails is not None:
+            self.thumbnails.cancel_pending()
+        self.endResetModel()
+
+    def refreshLabel(self, label_path):
+        """Look up the status of rows whose label is label_path again"""
+        # Only rows with cached status can be on screen with stale data
+        for row in [row for row in self._status
+                    if label_path_for_image(self.paths.path(row)) == label_path]:
+            del self._status[row]
+            self.dataChanged.emit(self.index(row, self.ANNOTATED), self.index(row, self.SAVED))
+
+    def _thumbnailReady(self, image_path):
+        row = self._thumbnail_rows.pop(image_path, None)
+        if row is not None and row < len(self.paths) and self.paths.path(row) == image_path:
+            index = self.index(row, self.NAME)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    @staticmethod
+    def _read_status(image_path):
+        label_path = label_path_for_image(image_path)
+        try:
+            saved = os.stat(label_path).st_mtime
+        except OSError:
+            return False, None, None
+        # The label header carries the grasp count, one small read
+        try:
+            grasp_count = read_label_header(label_path).get('annotation', {}).get('grasps')
+        except (OSError, LabelFormatError):
+            grasp_count = None
+        if grasp_count is None:
+            # Saved before headers held the count; regenerating the labels adds it
+            try:
+                _, _, sidecar = read_sidecar(sidecar_path(label_path))
+                grasp_count = len(sidecar['grasps'])
+            except (OSError, LabelFormatError):
+                grasp_count = None  # Saved before sidecars existed
+        return True, grasp_count, saved
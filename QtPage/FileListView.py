@@ -1,26 +1,55 @@
-from PyQt5.QtWidgets import QMainWindow, QHBoxLayout, QVBoxLayout, QWidget, QFileDialog, QListWidget, QPushButton, QLabel, QGroupBox
+from PyQt5.QtWidgets import (QMainWindow, QHBoxLayout, QVBoxLayout, QWidget, QFileDialog,
+                             QTableView, QHeaderView, QAbstractItemView, QPushButton, QLabel,
+                             QGroupBox)
 from PyQt5.QtGui import QPixmap, QImageReader, QImage
 from PyQt5.QtCore import Qt
-import os
 import numpy as np
+from GraspCore.Heatmap import preview_shape
+from GraspCore.Tracing import tracer
+from QtPage.FileListModel import FileListModel
+from QtPage.ImageCache import ImageCache
+from QtPage.ThumbnailCache import THUMBNAIL_SIZE, ThumbnailCache
 from QtPage.ShowView import ShowView
 
 
+PREFETCH_COUNT = 3  # List entries decoded ahead on each side of the selection
+
+
 class FileListView():
     def __init__(self, ShowViewIns) -> None:
         # variable
-        self.file_path = []
-        self.folder_path = ""
         self.ShowViewIns = ShowViewIns
+        self.image_cache = ImageCache()  # View-sized images, decoded ahead in the background
 
         # Component
-        self.list_widget = QListWidget()
+        # Model-backed view: rows are painted from the model on demand,
+        # nothing is created per file
+        self.thumbnails = ThumbnailCache()  # Persistent, one pack file per image folder
+        self.file_model = FileListModel(self.thumbnails)
+        self.list_view = QTableView()
+        self.list_view.setModel(self.file_model)
+        self.list_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.list_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.list_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.list_view.setShowGrid(False)
+        self.list_view.setWordWrap(False)
+        self.list_view.verticalHeader().hide()
+        self.list_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.list_view.setIconSize(THUMBNAIL_SIZE)
+        self.list_view.verticalHeader().setDefaultSectionSize(
+            max(THUMBNAIL_SIZE.height(), self.list_view.fontMetrics().height()) + 4)
+        header = self.list_view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(FileListModel.NAME, QHeaderView.Stretch)
+        header.resizeSection(FileListModel.ANNOTATED, 24)
+        header.resizeSection(FileListModel.GRASPS, 48)
+        header.resizeSection(FileListModel.SAVED, 80)
         self.clear_button = QPushButton("Clear List")
         self.select_folder_button = QPushButton("Select Folder")
 
         # Set fixed width
         self.widget = QWidget()
-        self.widget.setFixedWidth(200)  # Set fixed width to 200 pixels
+        self.widget.setFixedWidth(340)  # Set fixed width to 340 pixels, room for status columns
 
         self.layout = QVBoxLayout()
         self.widget.setLayout(self.layout)
@@ -28,36 +57,41 @@ class FileListView():
         self.file_list_groupbox = QGroupBox("File List")
         self.file_list_groupbox.setAlignment(Qt.AlignCenter)
 
-        # Set fixed width for list widget
-        self.list_widget.setFixedWidth(150)  # Set list widget width slightly smaller than container
+        # Set fixed width for list view
+        self.list_view.setFixedWidth(300)  # Set list view width slightly smaller than container
 
         # Set fixed width for buttons
         self.clear_button.setFixedWidth(160)
         self.select_folder_button.setFixedWidth(180)
 
         self.file_layout = QVBoxLayout()
-        self.file_layout.addWidget(self.list_widget)
+        self.file_layout.addWidget(self.list_view)
         self.file_layout.addWidget(self.clear_button)
         self.file_list_groupbox.setLayout(self.file_layout)
 
         self.layout.addWidget(self.file_list_groupbox)
 
         # Connect Function
-        self.list_widget.itemClicked.connect(self.displayImage)
+        self.list_view.clicked.connect(self.displayImage)
         self.clear_button.clicked.connect(self.clearList)
-        self.list_widget.currentItemChanged.connect(self.displayImage)
+        self.list_view.selectionModel().currentRowChanged.connect(self.displayImage)
+
+    def displayImage(self, index):
+        with tracer.span('displayImage'):
+            self.showImage(index)
 
-    def displayImage(self, item):
-        if not item:  # If no item is selected, return immediately
+    def showImage(self, index):
+        if not index.isValid():  # If no item is selected, return immediately
             return
 
         # Clear all previous information
-        self.ShowViewIns.grasp_lines = []  # Clear grasp line information
-        self.ShowViewIns.current_grasp_line = None  # Clear current selected grasp line
+        self.ShowViewIns.grasps.clear()  # Clear grasp line information
+        self.ShowViewIns.current_grasp_id = None  # Clear current selected grasp line
         self.ShowViewIns.quality_map = None  # Clear quality map
         self.ShowViewIns.angle_map = None  # Clear angle map
         self.ShowViewIns.width_map = None  # Clear width map
-        self.ShowViewIns.temp_pixmap = None  # Clear temporary image
+        self.ShowViewIns.heatmap_layers = None  # Clear cached heatmap layers
+        self.ShowViewIns.show_grasp_areas = False  # Hide grasp areas
         self.ShowViewIns.is_drawing = False  # Reset drawing state
         self.ShowViewIns.start_point = None  # Clear start point
         self.ShowViewIns.end_point = None  # Clear end point
@@ -69,12 +103,13 @@ class FileListView():
         self.ShowViewIns.angle_colorbar_label.clear()
 
         # origin image
-        file_path = os.path.join(self.folder_path, item.text())
+        file_path = self.file_model.path(index.row())
         self.ShowViewIns.current_file_path = file_path
-        origin = QPixmap(file_path)
-        scaled_pixmap = origin.scaled(640, 480, Qt.KeepAspectRatio)
+        with tracer.span('decode', path=file_path):
+            scaled_pixmap = QPixmap.fromImage(self.image_cache.get(file_path))
         self.ShowViewIns.current_pixmap = scaled_pixmap.copy()
         self.ShowViewIns.origin_image.setPixmap(scaled_pixmap)
+        self.prefetchNeighbours(index.row())
 
         # Update image display area information
         self.ShowViewIns.update_image_rect()
@@ -82,9 +117,9 @@ class FileListView():
         # Get actual display size
         display_rect = self.ShowViewIns.image_rect
         if display_rect:
-            # Calculate preview size (use half of display size)
-            preview_width = display_rect.width() // 2
-            preview_height = display_rect.height() // 2
+            # Preview labels match the size generate_heatmaps() rasterizes at
+            preview_height, preview_width = preview_shape(
+                display_rect.width(), display_rect.height())
 
             # Display label text
             self.ShowViewIns.quality_label.setText("Quality Map")
@@ -112,8 +147,21 @@ class FileListView():
             self.ShowViewIns.width_image.setFixedSize(
                 preview_width, preview_height)
 
+    def prefetchNeighbours(self, row):
+        # Next entries first, the usual stepping direction, then previous ones
+        rows = [row + i for i in range(1, PREFETCH_COUNT + 1)] + \
+               [row - i for i in range(1, PREFETCH_COUNT + 1)]
+        self.image_cache.prefetch([self.file_model.path(r) for r in rows
+                                   if 0 <= r < self.file_model.rowCount()])
+
+    def setFiles(self, file_paths):
+        """Replace the list with full paths, possibly from several folders"""
+        self.file_model.clear()
+        self.file_model.appendPaths(file_paths)
+
     def clearList(self):
-        self.list_widget.clear()
+        self.file_model.clear()
+        self.image_cache.clear()
         self.ShowViewIns.origin_image.setText("Please add and select an image :)")
         self.ShowViewIns.quality_image.clear()
         self.ShowViewIns.angle_image.clear()
@@ -130,7 +178,9 @@ class FileListView():
         self.ShowViewIns.angle_colorbar_label.clear()
 
     def showFirstImage(self):
-        if self.list_widget.count() > 0:
-            first_item = self.list_widget.item(0)
-            self.list_widget.setCurrentItem(first_item)
-            self.displayImage(first_item)
+        if self.file_model.rowCount() > 0:
+            first_index = self.file_model.index(0, FileListModel.NAME)
+            if self.list_view.currentIndex().row() == 0:
+                self.displayImage(first_index)
+            else:
+                self.list_view.setCurrentIndex(first_index)  # Displays through currentRowChanged
@@ -0,0 +1,54 @@
+import os
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from GraspCore.LabelDataset import IMAGE_EXTENSIONS
+
+
+class FolderScanner(QThread):
+    """
+    Lists the image files of a folder on a background thread
+    Uses os.scandir and extension checks only, so no file is opened or
+    probed; unreadable images surface when they are displayed. Names are
+    emitted in batches: the first one as soon as an image is found, then
+    every BATCH_SIZE names or BATCH_INTERVAL seconds.
+    """
+
+    BATCH_SIZE = 2000
+    BATCH_INTERVAL = 0.1
+
+    batch_found = pyqtSignal(list)  # file names, in directory order
+    scan_finished = pyqtSignal(int, float)  # image count, seconds
+
+    def __init__(self, folder_path, parent=None) -> None:
+        super().__init__(parent)
+        self.folder_path = folder_path
+
+    def run(self):
+        start = time.perf_counter()
+        count = 0
+        batch = []
+        last_emit = start
+        try:
+            with os.scandir(self.folder_path) as entries:
+                for entry in entries:
+                    if self.isInterruptionRequested():
+                        return
+                    if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS or \
+                       not entry.is_file():
+                        continue
+                    batch.append(entry.name)
+                    now = time.perf_counter()
+                    if count == 0 or len(batch) >= self.BATCH_SIZE or \
+                       now - last_emit >= self.BATCH_INTERVAL:
+                        count += len(batch)
+                        self.batch_found.emit(batch)
+                        batch = []
+                        last_emit = now
+        except OSError:
+            pass  # Folder vanished or unreadable, report what was found
+        if batch and not self.isInterruptionRequested():
+            count += len(batch)
+            self.batch_found.emit(batch)
+        self.scan_finished.emit(count, time.perf_counter() - start)
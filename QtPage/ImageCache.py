@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtGui import QImage, QImageReader
+from PyQt5.QtCore import Qt, QSize
+
+
+VIEW_SIZE = QSize(640, 480)  # Images are shown scaled to fit this size
+
+
+def load_view_image(file_path, view_size=VIEW_SIZE) -> QImage:
+    """
+    Decode an image scaled to fit view_size keeping aspect ratio
+    The size matches QPixmap(file_path).scaled(view_size, Qt.KeepAspectRatio),
+    which annotation coordinates depend on; the reader decodes straight to
+    that size where the format supports it (JPEG), which is much faster than
+    a full decode. QImage is safe to use off the GUI thread, QPixmap is not.
+    """
+    reader = QImageReader(file_path)
+    size = reader.size()
+    if size.isValid():
+        reader.setScaledSize(size.scaled(view_size, Qt.KeepAspectRatio))
+        return reader.read()
+    image = reader.read()
+    if image.isNull():
+        return image
+    return image.scaled(view_size, Qt.KeepAspectRatio)
+
+
+class ImageCache():
+    """
+    LRU cache of view-sized images keyed by path and modification time
+    Holds at most max_bytes of decoded pixels. prefetch() decodes paths on
+    a worker pool in the background; get() returns a cached image, waits
+    for one already being decoded, or decodes on the calling thread.
+    """
+
+    def __init__(self, max_bytes=256 << 20, workers=2) -> None:
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()  # (path, mtime_ns) -> QImage, least recently used first
+        self._bytes = 0
+        self._pending = {}  # (path, mtime_ns) -> Future
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-cache')
+
+    def get(self, file_path) -> QImage:
+        try:
+            key = self._key(file_path)
+        except OSError:
+            return QImage()  # Missing files show as a null image, like QPixmap(path)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+            future = self._pending.get(key)
+            if future is not None and future.cancel():
+                # Still queued behind other prefetches, decode it here instead
+                del self._pending[key]
+                future = None
+        if future is not None:
+            return future.result()  # Already decoding, finish that one
+        return self._load(key)
+
+    def prefetch(self, file_paths):
+        """Decode paths in the background in the given order, dropping older queued ones"""
+        keys = []
+        for file_path in file_paths:
+            try:
+                keys.append(self._key(file_path))
+            except OSError:
+                continue  # Moved or deleted, nothing to prefetch
+        with self._lock:
+            for key, future in list(self._pending.items()):
+                if key not in keys and future.cancel():
+                    del self._pending[key]
+            for key in keys:
+                if key not in self._images and key not in self._pending:
+                    self._pending[key] = self._pool.submit(self._load, key)
+
+    def clear(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+            self._images.clear()
+            self._bytes = 0
+
+    def shutdown(self):
+        self.clear()
+        self._pool.shutdown(wait=False)
+
+    def _load(self, key):
+        try:
+            image = load_view_image(key[0])
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        if image.isNull():
+            return image  # Not cached, a later fix to the file should show up
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._bytes += image.sizeInBytes()
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self._bytes -= evicted.sizeInBytes()
+        return image
+
+    @staticmethod
+    def _key(file_path):
+        return file_path, os.stat(file_path).st_mtime_ns
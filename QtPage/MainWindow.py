@@ -1,10 +1,12 @@
+import os
+
 from PyQt5.QtWidgets import QMainWindow, QHBoxLayout, QWidget, QFileDialog
-from PyQt5.QtCore import QFileInfo
-from PyQt5.QtGui import QImageReader
+from GraspCore.Tracing import tracer
 from QtPage.ActionView import ActionView
 from QtPage.FileListView import FileListView
+from QtPage.FolderScanner import FolderScanner
+from QtPage.SessionRecorder import SessionRecorder
 from QtPage.ShowView import ShowView
-import os
 
 
 class MainWindow(QMainWindow):
@@ -28,6 +30,11 @@ class MainWindow(QMainWindow):
         self.ShowViewIns = ShowView()
         self.ActionViewIns = ActionView(self.ShowViewIns)
         self.FileListViewIns = FileListView(self.ShowViewIns)
+        self.folder_scanner = None  # Background scan of the selected folder
+        self.FileListViewIns.clear_button.clicked.connect(self.stopFolderScan)
+        # Saved labels change the status columns of the file list
+        self.ActionViewIns.save_reporter.finished.connect(
+            self.FileListViewIns.file_model.refreshLabel)
 
         main_layout = QHBoxLayout()
         main_layout.addWidget(self.FileListViewIns.widget, 1)
@@ -38,6 +45,28 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
 
+        # GRASP_TRACE=trace.json traces from startup and writes the trace on close
+        self.trace_path = os.environ.get('GRASP_TRACE')
+        if self.trace_path:
+            self.ActionViewIns.trace_checkbox.setChecked(True)
+
+        # GRASP_RECORD=session.jsonl records the session for QtPage.SessionReplay
+        self.session_recorder = None
+        if os.environ.get('GRASP_RECORD'):
+            self.session_recorder = SessionRecorder(self, os.environ['GRASP_RECORD'])
+
+    def closeEvent(self, event):
+        self.stopFolderScan()
+        # Let queued label saves finish before the process exits
+        self.ActionViewIns.label_writer.shutdown(wait=True)
+        self.FileListViewIns.image_cache.shutdown()
+        self.FileListViewIns.thumbnails.close()
+        if self.trace_path:
+            tracer.write_chrome_trace(self.trace_path)
+        if self.session_recorder is not None:
+            self.session_recorder.close()
+        super().closeEvent(event)
+
     def selectFiles(self):
         dialog = QFileDialog()
         dialog.setFileMode(QFileDialog.ExistingFiles)
@@ -46,14 +75,11 @@ class MainWindow(QMainWindow):
 
         if dialog.exec_() == QFileDialog.Accepted:
             file_paths = dialog.selectedFiles()
+            self.stopFolderScan()
+            if self.session_recorder is not None:
+                self.session_recorder.record('files', paths=file_paths)
 
-            self.FileListViewIns.file_path = file_paths
-            self.FileListViewIns.folder_path = os.path.dirname(file_paths[0])
-            self.FileListViewIns.list_widget.clear()
-
-            for file_path in file_paths:
-                file_name = os.path.basename(file_path)
-                self.FileListViewIns.list_widget.addItem(file_name)
+            self.FileListViewIns.setFiles(file_paths)
 
             # Display the first image
             self.FileListViewIns.showFirstImage()
@@ -65,27 +91,46 @@ class MainWindow(QMainWindow):
         dialog.setOption(QFileDialog.ShowDirsOnly, True)
 
         if dialog.exec_() == QFileDialog.Accepted:
-            folder_path = dialog.selectedFiles()[0]
-
-            self.FileListViewIns.file_path = []
-            self.FileListViewIns.folder_path = folder_path
-            self.FileListViewIns.list_widget.clear()
-
-            for file_name in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, file_name)
-                file_info = QFileInfo(file_path)
-                if file_info.isFile() and self.isImageFile(file_info):
-                    self.FileListViewIns.list_widget.addItem(file_name)
-                    self.FileListViewIns.file_path.append(file_path)
-
-            # Display the first image
+            self.loadFolder(dialog.selectedFiles()[0])
+
+    def loadFolder(self, folder_path):
+        self.stopFolderScan()
+        if self.session_recorder is not None:
+            self.session_recorder.record('folder', path=folder_path)
+
+        self.FileListViewIns.file_model.clear()
+
+        # Scan in the background, images stream into the list in batches
+        self.folder_scanner = FolderScanner(folder_path)
+        self.folder_scanner.batch_found.connect(self.addScannedFiles)
+        self.folder_scanner.scan_finished.connect(self.folderScanFinished)
+        self.folder_scanner.start()
+
+    def addScannedFiles(self, file_names):
+        scanner = self.sender()
+        if scanner is None or scanner is not self.folder_scanner:
+            return  # Batch of a scan that was stopped, possibly already deleted
+        file_model = self.FileListViewIns.file_model
+        show_first = file_model.rowCount() == 0
+        file_model.appendNames(scanner.folder_path, file_names)
+
+        # Display the first image as soon as it is found
+        if show_first:
             self.FileListViewIns.showFirstImage()
 
-    def isImageFile(self, file_info):
-        # Get file extension
-        file_extension = file_info.suffix().lower()
-
-        # Use QImageReader to check if the extension is an image format
-        image_reader = QImageReader()
-        image_reader.setFileName(file_info.filePath())
-        return image_reader.canRead() and file_extension in ["jpg", "jpeg", "png", "gif", "bmp"]
+    def folderScanFinished(self, count, seconds):
+        scanner = self.sender()
+        if scanner is None or scanner is not self.folder_scanner:
+            return
+        output_list = self.ActionViewIns.output_list
+        output_list.addItem(f"Found {count} images in {seconds:.2f} s")
+        output_list.scrollToBottom()
+
+    def stopFolderScan(self):
+        if self.folder_scanner is not None:
+            # Disconnect first, batches already queued must not reach the new list
+            self.folder_scanner.batch_found.disconnect(self.addScannedFiles)
+            self.folder_scanner.scan_finished.disconnect(self.folderScanFinished)
+            self.folder_scanner.requestInterruption()
+            self.folder_scanner.wait()
+            self.folder_scanner = None
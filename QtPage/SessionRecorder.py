@@ -0,0 +1,76 @@
+import json
+import time
+
+from PyQt5.QtCore import QObject, QEvent
+from PyQt5.QtWidgets import QAbstractButton, QComboBox, QSlider
+
+
+SESSION_VERSION = 1
+MOUSE_KINDS = {QEvent.MouseButtonPress: 'press',
+               QEvent.MouseMove: 'move',
+               QEvent.MouseButtonRelease: 'release'}
+# Controls that open dialogs or only change tracing are not part of a session
+SKIPPED_CONTROLS = ('trace_checkbox', 'trace_export_button')
+
+
+def session_controls(action_view):
+    """{attribute name: widget} of the buttons, sliders and combo boxes of an ActionView"""
+    return {name: widget for name, widget in vars(action_view).items()
+            if isinstance(widget, (QAbstractButton, QSlider, QComboBox))
+            and name not in SKIPPED_CONTROLS}
+
+
+class SessionRecorder(QObject):
+    """
+    Records an annotation session as JSON lines for SessionReplay
+    One line per event with its time in ms since recording started:
+    mouse press, move and release on the original image label (label
+    coordinates), button clicks, slider and combo box values by ActionView
+    attribute name, file list selection, and the folder or files loaded.
+    """
+
+    def __init__(self, main_window, path) -> None:
+        super().__init__(main_window)
+        self._file = open(path, 'w', encoding='utf-8')
+        self._start = time.perf_counter()
+        self._write({'type': 'session', 'version': SESSION_VERSION,
+                     'date': time.strftime('%Y-%m-%dT%H:%M:%S')})
+
+        main_window.ShowViewIns.origin_image.installEventFilter(self)
+        for name, widget in session_controls(main_window.ActionViewIns).items():
+            if isinstance(widget, QSlider):
+                widget.valueChanged.connect(
+                    lambda value, name=name: self.record('slider', name=name, value=value))
+            elif isinstance(widget, QComboBox):
+                widget.currentIndexChanged.connect(
+                    lambda index, name=name: self.record('combo', name=name, index=index))
+            else:
+                widget.clicked.connect(lambda checked=False, name=name: self.record('click', name=name))
+
+        self._file_model = main_window.FileListViewIns.file_model
+        main_window.FileListViewIns.list_view.selectionModel().currentRowChanged.connect(
+            self._rowSelected)
+
+    def record(self, event_type, **fields):
+        if self._file is not None:
+            self._write({'t': round((time.perf_counter() - self._start) * 1000, 3),
+                         'type': event_type, **fields})
+
+    def eventFilter(self, obj, event):
+        kind = MOUSE_KINDS.get(event.type())
+        if kind is not None:
+            self.record('mouse', kind=kind, x=event.x(), y=event.y(), button=int(event.button()),
+                        buttons=int(event.buttons()), modifiers=int(event.modifiers()))
+        return False
+
+    def _rowSelected(self, current, previous):
+        if current.isValid():
+            self.record('select', row=current.row(), name=self._file_model.name(current.row()))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + '\n')
@@ -0,0 +1,259 @@
+"""
+Replay a recorded annotation session against the real window, headless
+
+    python -m QtPage.SessionReplay SESSION [--folder FOLDER] [--speed X | --fast]
+        [--frame-ms MS] [--output REPORT] [--trace TRACE]
+
+Sessions are recorded with GRASP_RECORD=session.jsonl python main.py. The
+replay opens MainWindow on the offscreen Qt platform (unless QT_QPA_PLATFORM
+is set), loads the recorded folder or files, and sends every event at its
+recorded time divided by --speed, or back to back with --fast. Saves in the
+session write labels as they did when recording, so point --folder at a copy
+of the images to keep the originals untouched.
+
+An event's latency is the time to handle it plus the work it posts,
+repaints and queued slots included: events are processed until the queue
+is idle. Results from worker threads, such as finished saves, are charged
+to the event being handled when they arrive. Every
+--frame-ms interval an event takes beyond the first counts as a dropped
+frame. When the replay falls behind, a mouse move already overtaken by a
+later one is coalesced, as Qt does, and counted; brush strokes then get
+fewer points, so only --fast reproduces the recorded label maps exactly.
+Message box warnings are counted instead of shown.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+
+FRAME_MS = 1000 / 60
+MAX_SETTLE_PASSES = 100  # Bounds settle() when something keeps posting events
+
+
+def read_session(path):
+    """(header, events) of a session file"""
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries or entries[0].get('type') != 'session':
+        raise ValueError(f"{path} is not a recorded session")
+    return entries[0], entries[1:]
+
+
+def event_key(event):
+    """Name latencies are grouped by, e.g. 'mouse move' or 'click save_button'"""
+    if event['type'] == 'mouse':
+        return f"mouse {event['kind']}"
+    if 'name' in event and event['type'] != 'select':
+        return f"{event['type']} {event['name']}"
+    return event['type']
+
+
+def latency_stats(latencies, frame_ms):
+    values = np.asarray(latencies)
+    return {
+        'count': len(values),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+        'dropped_frames': int(sum(max(0, math.ceil(value / frame_ms) - 1) for value in values)),
+    }
+
+
+class SessionPlayer():
+    """Drives a MainWindow with the events of a recorded session"""
+
+    def __init__(self, app, window, folder=None) -> None:
+        from QtPage.SessionRecorder import session_controls
+        self.app = app
+        self.window = window
+        self.folder = folder
+        self.controls = session_controls(window.ActionViewIns)
+        self.label = window.ShowViewIns.origin_image
+        self.mismatched_rows = 0
+
+    def settle(self):
+        """Process events until none are pending, including those posted meanwhile"""
+        for _ in range(MAX_SETTLE_PASSES):
+            self.app.sendPostedEvents()
+            self.app.processEvents()
+            if not self.app.hasPendingEvents():
+                return
+
+    def dispatch(self, event):
+        from PyQt5.QtCore import QEvent, QPointF, Qt
+        from PyQt5.QtGui import QMouseEvent
+        from PyQt5.QtWidgets import QApplication
+
+        event_type = event['type']
+        if event_type == 'mouse':
+            kind = {'press': QEvent.MouseButtonPress, 'move': QEvent.MouseMove,
+                    'release': QEvent.MouseButtonRelease}[event['kind']]
+            QApplication.sendEvent(self.label, QMouseEvent(
+                kind, QPointF(event['x'], event['y']), Qt.MouseButton(event['button']),
+                Qt.MouseButtons(event['buttons']), Qt.KeyboardModifiers(event['modifiers'])))
+        elif event_type == 'click':
+            self.controls[event['name']].click()
+        elif event_type == 'slider':
+            self.controls[event['name']].setValue(event['value'])
+        elif event_type == 'combo':
+            self.controls[event['name']].setCurrentIndex(event['index'])
+        elif event_type == 'select':
+            file_list = self.window.FileListViewIns
+            row = event['row']
+            if row >= file_list.file_model.rowCount() or file_list.file_model.name(row) != event['name']:
+                self.mismatched_rows += 1
+                return
+            file_list.list_view.setCurrentIndex(file_list.file_model.index(row, 0))
+        elif event_type == 'folder':
+            self.window.loadFolder(self.folder or event['path'])
+            # The session continued on the listed folder, wait for the scan
+            scanner = self.window.folder_scanner
+            while scanner is not None and not scanner.isFinished():
+                self.app.processEvents()
+                time.sleep(0.001)
+        elif event_type == 'files':
+            paths = event['paths']
+            if self.folder:
+                paths = [os.path.join(self.folder, os.path.basename(path)) for path in paths]
+            self.window.stopFolderScan()
+            self.window.FileListViewIns.setFiles(paths)
+            self.window.FileListViewIns.showFirstImage()
+        self.settle()
+
+    def play(self, events, speed=1.0):
+        """[(event, latency ms, lag ms)] of the events that were sent, and coalesced count"""
+        played = []
+        coalesced = 0
+        start = time.perf_counter()
+        for i, event in enumerate(events):
+            due = start + event['t'] / 1000 / speed if speed else None
+            if due is not None:
+                while time.perf_counter() < due:
+                    self.app.processEvents()  # Background work lands while waiting
+                    time.sleep(min(0.001, max(0.0, due - time.perf_counter())))
+                # Behind schedule: a move the next move has overtaken would be merged
+                following = events[i + 1] if i + 1 < len(events) else None
+                if event['type'] == 'mouse' and event['kind'] == 'move' and \
+                        following is not None and following['type'] == 'mouse' and \
+                        following['kind'] == 'move' and \
+                        start + following['t'] / 1000 / speed <= time.perf_counter():
+                    coalesced += 1
+                    continue
+
+            sent = time.perf_counter()
+            self.dispatch(event)
+            latency = (time.perf_counter() - sent) * 1000
+            played.append((event, latency, (sent - due) * 1000 if due is not None else 0.0))
+        return played, coalesced
+
+
+def replay(session_path, folder=None, speed=1.0, frame_ms=FRAME_MS, trace_path=None, log=print):
+    """Replay a session file, returns the report dictionary"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    from GraspCore.Tracing import tracer
+    from QtPage.MainWindow import MainWindow
+
+    header, events = read_session(session_path)
+    app = QApplication.instance() or QApplication([])
+
+    # Modal boxes would block the replay, count them instead
+    warnings = []
+
+    def count_warning(parent, title, text, *args, **kwargs):
+        warnings.append(text)
+        return QMessageBox.Ok
+    QMessageBox.warning = count_warning
+
+    window = MainWindow()
+    window.showMaximized()
+    app.processEvents()
+    if trace_path:
+        window.ActionViewIns.trace_checkbox.setChecked(True)
+
+    player = SessionPlayer(app, window, folder)
+    log(f"Replaying {len(events)} events from {session_path}" +
+        (" as fast as possible" if not speed else f" at {speed:g}x speed"))
+    started = time.perf_counter()
+    played, coalesced = player.play(events, speed)
+    replay_seconds = time.perf_counter() - started
+    window.close()  # Waits for queued saves
+    finish_seconds = time.perf_counter() - started - replay_seconds
+    if trace_path:
+        tracer.write_chrome_trace(trace_path)
+
+    groups = {}
+    for event, latency, _ in played:
+        groups.setdefault(event_key(event), []).append(latency)
+    latencies = [latency for _, latency, _ in played]
+    lags = [lag for _, _, lag in played]
+    report = {
+        'session': os.path.abspath(session_path),
+        'recorded': header.get('date'),
+        'speed': speed,
+        'frame_ms': frame_ms,
+        'events': len(events),
+        'played': len(played),
+        'coalesced_moves': coalesced,
+        'warnings': len(warnings),
+        'mismatched_rows': player.mismatched_rows,
+        'replay_seconds': replay_seconds,
+        'finish_seconds': finish_seconds,
+        'over_frame_budget': int(sum(latency > frame_ms for latency in latencies)),
+        'lag_p95_ms': float(np.percentile(lags, 95)) if lags else 0.0,
+        'all': latency_stats(latencies, frame_ms) if latencies else None,
+        'by_event': {key: latency_stats(values, frame_ms) for key, values in sorted(groups.items())},
+        'timeline': [[event['t'], event_key(event), round(latency, 3), round(lag, 3)]
+                     for event, latency, lag in played],
+    }
+
+    log(f"{report['played']} events in {replay_seconds:.1f} s, {coalesced} moves coalesced, "
+        f"{len(warnings)} warnings, saves finished {finish_seconds:.2f} s after the last event")
+    log(f"{'event':30s} {'count':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max ms':>8s} {'dropped':>8s}")
+    rows = list(report['by_event'].items()) + ([('all', report['all'])] if latencies else [])
+    for key, stats in rows:
+        log(f"{key:30s} {stats['count']:6d} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} "
+            f"{stats['p99_ms']:8.2f} {stats['max_ms']:8.2f} {stats['dropped_frames']:8d}")
+    log(f"{report['over_frame_budget']} events over the {frame_ms:.1f} ms frame budget, "
+        f"dispatch lag p95 {report['lag_p95_ms']:.1f} ms")
+    if player.mismatched_rows:
+        log(f"{player.mismatched_rows} file selections did not match the listed files and were skipped")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Replay a recorded annotation session headless and report event latency')
+    parser.add_argument('session', help='session file recorded with GRASP_RECORD')
+    parser.add_argument('--folder', help='image folder to replay against instead of the recorded one')
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument('--speed', type=float, default=1.0,
+                        help='replay speed relative to the recording (default: 1)')
+    pacing.add_argument('--fast', action='store_true', help='send events back to back')
+    parser.add_argument('--frame-ms', type=float, default=FRAME_MS,
+                        help='frame budget for dropped frame counts (default: 60 Hz)')
+    parser.add_argument('--output', help='write the report as JSON')
+    parser.add_argument('--trace', help='also trace spans and write them as Chrome trace JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        report = replay(args.session, args.folder, 0 if args.fast else args.speed,
+                        args.frame_ms, args.trace)
+    except (OSError, ValueError) as e:
+        print(f"Replay failed: {e}", file=sys.stderr)
+        return 1
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,14 @@
 from PyQt5.QtWidgets import QMainWindow, QHBoxLayout, QVBoxLayout, QWidget, QFileDialog, QListWidget, QPushButton, QLabel, QGroupBox
-from PyQt5.QtCore import Qt, QPoint, QRect
-from PyQt5.QtGui import QPixmap, QImageReader, QImage, QFont, QPainter, QPen, QCursor
+from PyQt5.QtCore import Qt, QPoint, QPointF, QLineF, QRect
+from PyQt5.QtGui import QPixmap, QImageReader, QImage, QFont, QPainter, QPen, QCursor, QPolygonF
 import numpy as np
 from typing import Tuple
-import math
-from skimage.draw import polygon  # Import polygon from skimage.draw
+from GraspCore.Colormap import (COLORBAR_LABELS, MAP_COLORMAPS, apply_colormap, colorbar_gradient,
+                                colormap_scratch)
+from GraspCore.GraspSet import GraspSet
+from GraspCore.Heatmap import HeatmapLayers, preview_shape
+from GraspCore.SpatialIndex import SegmentGrid
+from GraspCore.Tracing import traced, tracer
 
 
 class ClickableLabel(QLabel):
@@ -38,6 +42,21 @@ class ClickableLabel(QLabel):
                 self.parent_view.mouseReleaseEvent(event)
 
 
+class GraspOverlay(QWidget):
+    """Transparent layer over the original image that paints the grasp annotations"""
+
+    def __init__(self, parent_view, parent=None):
+        super().__init__(parent)
+        self.parent_view = parent_view
+        # Mouse events keep going to the image label underneath
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        self.parent_view.paint_overlay(painter, event.rect())
+        painter.end()
+
+
 class ShowView():
     def __init__(self) -> None:
         # Component
@@ -45,7 +64,7 @@ class ShowView():
         self.start_point = None
         self.end_point = None
         self.current_pixmap = None
-        self.temp_pixmap = None
+        self.rubber_band_end = None  # Current end of the line being drawn
         self.image_rect = None  # Store actual display area of the image
 
         self.origin_image = ClickableLabel(
@@ -59,6 +78,12 @@ class ShowView():
         self.origin_image.setGeometry(100, 100, 640, 480)
         self.origin_image.setFixedSize(640, 480)
 
+        # Grasp annotations are painted on a retained layer over the image
+        self.overlay = GraspOverlay(self, self.origin_image)
+        self.overlay.setGeometry(0, 0, 640, 480)
+        self.overlay_rects = {}  # grasp id -> last painted area
+        self.show_grasp_areas = False  # Blue grasp areas shown after Generate
+
         self.quality_image = QLabel()
         self.quality_image.setAlignment(Qt.AlignCenter)
 
@@ -160,19 +185,27 @@ class ShowView():
         self.on_drawing_finished = None
 
         # Add new grasp line information storage
-        self.grasp_lines = []  # Store all grasp line information
-        self.current_grasp_line = None  # Currently selected grasp line
+        self.grasps = GraspSet()  # Store all grasp line information
+        self.current_grasp_id = None  # Id of the currently selected grasp line
+        self.grasp_index = SegmentGrid()  # Spatial index of grasp center axes
+        self.indexed_revision = self.grasps.geometry_revision  # Axis revision the index matches
 
         # Add related properties
         self.quality_map = None
         self.angle_map = None
         self.width_map = None
+        self.heatmap_layers = None  # Cached per-grasp heatmap layers
+        self.preview_layers = None  # Layers the preview pixmaps were built from
+        self.preview_buffers = None  # Reused RGB buffers for full preview refreshes
+        self.colormap_scratch = None  # Reused colormap_scratch() buffers of the preview size
+        self.blit_buffer = None  # Flat RGB buffer, recolored rectangles use its leading part
+        self.colorbar_cache = {}  # (map type, height, colormap) -> color scale pixmap
 
         self.click_tolerance = 5  # Half width of center axis clickable area (total width 10px)
 
         # Add fine-tuning related properties
         self.fine_tune_mode = None  # 'up', 'down', or 'select'
-        self.fine_tune_radius = 10  # Changed to 10 (was 20)
+        self.fine_tune_radius = 10  # Brush radius in image pixels, up to 100
         self.fine_tune_strength = 0.1  # Fine-tuning strength per adjustment
 
         # Modify mouse tracking
@@ -212,52 +245,27 @@ class ShowView():
 
         self.image_rect = QRect(
             x, y, scaled_size.width(), scaled_size.height())
-
-    def distance_to_line(self, point, line_start, line_end):
-        """Calculate distance from point to line segment"""
-        px = point[0]
-        py = point[1]
-        x1 = line_start[0]
-        y1 = line_start[1]
-        x2 = line_end[0]
-        y2 = line_end[1]
-
-        # Calculate square of line segment length
-        l2 = (x2 - x1) ** 2 + (y2 - y1) ** 2
-
-        if l2 == 0:
-            # If line segment length is 0, return distance to endpoint
-            return math.sqrt((px - x1) ** 2 + (py - y1) ** 2)
-
-        # Calculate projection position parameter t of point to line segment
-        t = max(0, min(1, ((px - x1) * (x2 - x1) + (py - y1) * (y2 - y1)) / l2))
-
-        # Calculate projection point coordinates
-        proj_x = x1 + t * (x2 - x1)
-        proj_y = y1 + t * (y2 - y1)
-
-        # Return distance from point to projection point
-        return math.sqrt((px - proj_x) ** 2 + (py - proj_y) ** 2)
+        self.refresh_overlay()
 
     def find_nearest_line(self, point):
-        """Find the grasp line nearest to click position"""
-        if not self.grasp_lines:
+        """Find the id of the grasp line nearest to click position"""
+        if not len(self.grasps):
             return None
 
-        min_distance = float('inf')
-        nearest_line = None
+        # Axes may have been added, removed or cleared from outside, rebuild then;
+        # width edits leave the axes and so the index as they are
+        if self.indexed_revision != self.grasps.geometry_revision:
+            self.rebuild_grasp_index()
 
-        for line in self.grasp_lines:
-            distance = self.distance_to_line(
-                point,
-                line['start'],
-                line['end']
-            )
-            if distance < min_distance and distance <= self.click_tolerance:
-                min_distance = distance
-                nearest_line = line
+        return self.grasp_index.nearest(point, self.click_tolerance)
 
-        return nearest_line
+    def rebuild_grasp_index(self):
+        """Re-register every grasp center axis in the spatial index"""
+        self.grasp_index.clear()
+        starts, ends = self.grasps.endpoints()
+        for grasp_id, start, end in zip(self.grasps.ids.tolist(), starts.tolist(), ends.tolist()):
+            self.grasp_index.insert(grasp_id, start, end, grasp_id)
+        self.indexed_revision = self.grasps.geometry_revision
 
     def mousePressEvent(self, event):
         if self.fine_tune_mode in ['up', 'down'] and event.button() == Qt.LeftButton:
@@ -266,157 +274,61 @@ class ShowView():
         elif self.is_drawing and event.button() == Qt.LeftButton:
             # Handle click in drawing mode
             self.start_point = event.mapped_pos
-            if self.current_pixmap:
-                self.temp_pixmap = self.current_pixmap.copy()
+            self.rubber_band_end = None
         elif not self.is_drawing and event.button() == Qt.LeftButton:
             # Non-drawing mode, check if clicked on a center axis
             clicked_point = (event.mapped_pos.x(), event.mapped_pos.y())
-            nearest_line = self.find_nearest_line(clicked_point)
-
-            if nearest_line:
-                # Update currently selected grasp line
-                self.current_grasp_line = nearest_line
-
-                # Redraw all lines, highlight selected line
-                if self.current_pixmap:
-                    self.current_pixmap = self.temp_pixmap.copy()
-                    painter = QPainter(self.current_pixmap)
-
-                    # Draw all unselected lines first
-                    for line in self.grasp_lines:
-                        if line != self.current_grasp_line:
-                            # Draw red center axis
-                            painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
-                            painter.drawLine(
-                                int(line['start'][0]), int(line['start'][1]),
-                                int(line['end'][0]), int(line['end'][1])
-                            )
-
-                            # If there's a perpendicular line, draw blue perpendicular line
-                            if line['perp_line']:
-                                painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
-                                painter.drawLine(
-                                    int(line['perp_line']['start'][0]),
-                                    int(line['perp_line']['start'][1]),
-                                    int(line['perp_line']['end'][0]),
-                                    int(line['perp_line']['end'][1])
-                                )
-
-                    # Draw selected line (using thicker line)
-                    painter.setPen(QPen(Qt.red, 4, Qt.SolidLine))
-                    painter.drawLine(
-                        int(self.current_grasp_line['start'][0]),
-                        int(self.current_grasp_line['start'][1]),
-                        int(self.current_grasp_line['end'][0]),
-                        int(self.current_grasp_line['end'][1])
-                    )
-
-                    # If selected line has perpendicular line, draw it with thicker line
-                    if self.current_grasp_line['perp_line']:
-                        painter.setPen(QPen(Qt.blue, 4, Qt.SolidLine))
-                        painter.drawLine(
-                            int(self.current_grasp_line['perp_line']
-                                ['start'][0]),
-                            int(self.current_grasp_line['perp_line']
-                                ['start'][1]),
-                            int(self.current_grasp_line['perp_line']
-                                ['end'][0]),
-                            int(self.current_grasp_line['perp_line']['end'][1])
-                        )
-
-                    painter.end()
-                    self.origin_image.setPixmap(
-                        self.current_pixmap.scaled(640, 480, Qt.KeepAspectRatio))
+            nearest_id = self.find_nearest_line(clicked_point)
+
+            if nearest_id is not None:
+                self.hide_grasp_areas()
+                # Update currently selected grasp line, repaint old and new selection
+                previous_id = self.current_grasp_id
+                self.current_grasp_id = nearest_id
+                if previous_id is not None:
+                    self.update_overlay_line(previous_id)
+                self.update_overlay_line(nearest_id)
 
     def mouseMoveEvent(self, event):
         if self.fine_tune_mode in ['up', 'down'] and event.buttons() & Qt.LeftButton:
             # When mouse is pressed and moved, also update value
             self.update_quality_value(event.mapped_pos)
         elif self.is_drawing and self.start_point:
-            if self.temp_pixmap:
-                drawing_pixmap = self.temp_pixmap.copy()
-                painter = QPainter(drawing_pixmap)
-                painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
-                painter.drawLine(self.start_point, event.mapped_pos)
-                painter.end()
-                self.origin_image.setPixmap(
-                    drawing_pixmap.scaled(640, 480, Qt.KeepAspectRatio))
+            # Repaint only the area covered by the old and new rubber band
+            dirty = self.rubber_band_rect()
+            self.rubber_band_end = event.mapped_pos
+            self.update_overlay_rect(dirty.united(self.rubber_band_rect()))
 
     def mouseReleaseEvent(self, event):
         if self.is_drawing and event.button() == Qt.LeftButton and self.start_point:
             self.end_point = event.mapped_pos
             if self.current_pixmap:
-                # Create new grasp line information
-                grasp_line = {
-                    'start': (self.start_point.x(), self.start_point.y()),
-                    'end': (self.end_point.x(), self.end_point.y()),
-                    'perp_line': None,  # Store perpendicular line information
-                    'length': None,     # Store line segment length
-                    'center': None,     # Store center point
-                    'angle': None       # Store angle
-                }
-
-                # Calculate and store grasp line information
-                dx = self.end_point.x() - self.start_point.x()
-                dy = self.end_point.y() - self.start_point.y()
-                grasp_line['length'] = math.sqrt(dx*dx + dy*dy)
-                grasp_line['center'] = (
-                    (self.start_point.x() + self.end_point.x()) / 2,
-                    (self.start_point.y() + self.end_point.y()) / 2
-                )
-                grasp_line['angle'] = math.atan2(dy, dx)
+                start = (self.start_point.x(), self.start_point.y())
+                end = (self.end_point.x(), self.end_point.y())
 
                 # Add to table
-                self.grasp_lines.append(grasp_line)
+                self.hide_grasp_areas()
+                index_current = self.indexed_revision == self.grasps.geometry_revision
+                grasp_id = self.grasps.add(start, end)
+                if index_current:
+                    self.grasp_index.insert(grasp_id, start, end, grasp_id)
+                    self.indexed_revision = self.grasps.geometry_revision
 
                 # Set as currently selected line
-                self.current_grasp_line = grasp_line
-
-                # Redraw all segments
-                self.current_pixmap = self.temp_pixmap.copy()
-                painter = QPainter(self.current_pixmap)
-
-                # Draw all unselected lines first
-                for line in self.grasp_lines:
-                    if line != self.current_grasp_line:
-                        # Draw red center axis
-                        painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
-                        painter.drawLine(
-                            int(line['start'][0]), int(line['start'][1]),
-                            int(line['end'][0]), int(line['end'][1])
-                        )
-
-                        # If there's a perpendicular line, draw blue perpendicular line
-                        if line['perp_line']:
-                            painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
-                            painter.drawLine(
-                                int(line['perp_line']['start'][0]),
-                                int(line['perp_line']['start'][1]),
-                                int(line['perp_line']['end'][0]),
-                                int(line['perp_line']['end'][1])
-                            )
-
-                # Draw selected line (using thicker line)
-                painter.setPen(QPen(Qt.red, 4, Qt.SolidLine))
-                painter.drawLine(
-                    int(self.current_grasp_line['start'][0]),
-                    int(self.current_grasp_line['start'][1]),
-                    int(self.current_grasp_line['end'][0]),
-                    int(self.current_grasp_line['end'][1])
-                )
-
-                painter.end()
-                self.origin_image.setPixmap(
-                    self.current_pixmap.scaled(640, 480, Qt.KeepAspectRatio))
-
-                # Save current state
-                self.temp_pixmap = self.current_pixmap.copy()
-
-                print(
-                    f"Added new grasp line from {grasp_line['start']} to {grasp_line['end']}")
+                previous_id = self.current_grasp_id
+                self.current_grasp_id = grasp_id
+
+                # Repaint previous selection, new line and rubber band area
+                if previous_id is not None:
+                    self.update_overlay_line(previous_id)
+                self.update_overlay_rect(self.rubber_band_rect())
+                self.update_overlay_line(grasp_id)
+
+                print(f"Added new grasp line from {start} to {end}")
 
             self.start_point = None
             self.end_point = None
+            self.rubber_band_end = None
             self.is_drawing = False
 
             if self.on_drawing_finished:
@@ -424,139 +336,129 @@ class ShowView():
 
     def draw_perpendicular_line(self, length_ratio=0.25):
         """Draw perpendicular line at center of currently selected grasp line"""
-        if not self.current_grasp_line:
+        if self.current_grasp_id is None:
             return False
 
-        # Calculate length of perpendicular line
-        perp_length = self.current_grasp_line['length'] * length_ratio
-
-        # Calculate angle of perpendicular line
-        perp_angle = self.current_grasp_line['angle'] + math.pi/2
-
-        # Calculate perpendicular line endpoints
-        center = self.current_grasp_line['center']
-        half_length = perp_length / 2
-        start_x = center[0] - half_length * math.cos(perp_angle)
-        start_y = center[1] - half_length * math.sin(perp_angle)
-        end_x = center[0] + half_length * math.cos(perp_angle)
-        end_y = center[1] + half_length * math.sin(perp_angle)
-
-        # Store perpendicular line information
-        self.current_grasp_line['perp_line'] = {
-            'start': (start_x, start_y),
-            'end': (end_x, end_y),
-            'length_ratio': length_ratio
-        }
+        # Store perpendicular line as a ratio of the center axis length
+        self.hide_grasp_areas()
+        if not self.grasps.set_width_ratio(self.current_grasp_id, length_ratio):
+            return False
 
-        # Redraw all segments
+        # Repaint only the selected grasp line
         if self.current_pixmap:
-            self.current_pixmap = self.temp_pixmap.copy()
-            painter = QPainter(self.current_pixmap)
-
-            # Draw all grasp lines
-            for line in self.grasp_lines:
-                # Draw red center axis first
-                if line == self.current_grasp_line:
-                    # Current selected line draw thicker
-                    painter.setPen(QPen(Qt.red, 4, Qt.SolidLine))
-                else:
-                    painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
-
-                painter.drawLine(
-                    int(line['start'][0]), int(line['start'][1]),
-                    int(line['end'][0]), int(line['end'][1])
-                )
-
-                # If there's a perpendicular line, draw blue perpendicular line
-                if line['perp_line']:
-                    # Calculate perpendicular line endpoints
-                    center = line['center']
-                    perp_length = line['length'] * \
-                        line['perp_line']['length_ratio']
-                    half_length = perp_length / 2
-                    perp_angle = line['angle'] + math.pi/2
-
-                    start_x = center[0] - half_length * math.cos(perp_angle)
-                    start_y = center[1] - half_length * math.sin(perp_angle)
-                    end_x = center[0] + half_length * math.cos(perp_angle)
-                    end_y = center[1] + half_length * math.sin(perp_angle)
-
-                    if line == self.current_grasp_line:
-                        # Current selected line's perpendicular line draw thicker
-                        painter.setPen(QPen(Qt.blue, 4, Qt.SolidLine))
-                    else:
-                        painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
-
-                    painter.drawLine(
-                        int(start_x), int(start_y),
-                        int(end_x), int(end_y)
-                    )
-
-            painter.end()
-            self.origin_image.setPixmap(
-                self.current_pixmap.scaled(640, 480, Qt.KeepAspectRatio))
+            self.update_overlay_line(self.current_grasp_id)
             return True
         return False
 
+    @traced()
     def update_perpendicular_line(self, length_ratio):
         """Update length of perpendicular line of currently selected grasp line"""
-        if not self.current_grasp_line:
+        row = self.grasps.row_of(self.current_grasp_id)
+        if row is None:
             return False
 
         # Update length ratio of perpendicular line of currently selected line
-        if self.current_grasp_line['perp_line']:
-            self.current_grasp_line['perp_line']['length_ratio'] = length_ratio
+        self.hide_grasp_areas()
+        if self.grasps.has_width()[row]:
+            self.grasps.set_width_ratio(self.current_grasp_id, length_ratio)
 
-        # Redraw all segments
+        # Repaint only the selected grasp line
         if self.current_pixmap:
-            self.current_pixmap = self.temp_pixmap.copy()
-            painter = QPainter(self.current_pixmap)
-
-            # Draw all grasp lines
-            for line in self.grasp_lines:
-                # Draw red center axis first
-                if line == self.current_grasp_line:
-                    # Current selected line draw thicker
-                    painter.setPen(QPen(Qt.red, 4, Qt.SolidLine))
-                else:
-                    painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
-
-                painter.drawLine(
-                    int(line['start'][0]), int(line['start'][1]),
-                    int(line['end'][0]), int(line['end'][1])
-                )
-
-                # If there's a perpendicular line, draw blue perpendicular line
-                if line['perp_line']:
-                    # Calculate perpendicular line endpoints
-                    center = line['center']
-                    perp_length = line['length'] * \
-                        line['perp_line']['length_ratio']
-                    half_length = perp_length / 2
-                    perp_angle = line['angle'] + math.pi/2
-
-                    start_x = center[0] - half_length * math.cos(perp_angle)
-                    start_y = center[1] - half_length * math.sin(perp_angle)
-                    end_x = center[0] + half_length * math.cos(perp_angle)
-                    end_y = center[1] + half_length * math.sin(perp_angle)
-
-                    if line == self.current_grasp_line:
-                        # Current selected line's perpendicular line draw thicker
-                        painter.setPen(QPen(Qt.blue, 4, Qt.SolidLine))
-                    else:
-                        painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
-
-                    painter.drawLine(
-                        int(start_x), int(start_y),
-                        int(end_x), int(end_y)
-                    )
-
-            painter.end()
-            self.origin_image.setPixmap(
-                self.current_pixmap.scaled(640, 480, Qt.KeepAspectRatio))
+            self.update_overlay_line(self.current_grasp_id)
             return True
         return False
 
+    def overlay_bounds(self, rows=slice(None)):
+        """Image-coordinate (left, top, right, bottom) painted per grasp, pen width included"""
+        return self.grasps.bounds(rows, padding=3, include_areas=self.show_grasp_areas)
+
+    def overlay_line_rect(self, grasp_id):
+        """Image-coordinate area painted for a grasp line, pen width included"""
+        row = self.grasps.row_of(grasp_id)
+        if row is None:
+            return QRect()
+        left, top, right, bottom = self.overlay_bounds(slice(row, row + 1))[0].astype(int).tolist()
+        return QRect(left, top, right - left + 1, bottom - top + 1)
+
+    def rubber_band_rect(self):
+        """Image-coordinate area painted for the line being drawn"""
+        if not self.start_point or not self.rubber_band_end:
+            return QRect()
+        return QRect(self.start_point, self.rubber_band_end).normalized().adjusted(-2, -2, 2, 2)
+
+    def update_overlay_line(self, grasp_id):
+        """Repaint the previous and current area of one grasp line"""
+        rect = self.overlay_line_rect(grasp_id)
+        previous = self.overlay_rects.get(grasp_id)
+        dirty = rect.united(previous) if previous is not None else rect
+        self.overlay_rects[grasp_id] = rect
+        self.update_overlay_rect(dirty)
+
+    def update_overlay_rect(self, rect):
+        """Schedule a repaint of an image-coordinate area of the overlay"""
+        if self.image_rect and not rect.isEmpty():
+            self.overlay.update(rect.translated(self.image_rect.topLeft()))
+
+    def refresh_overlay(self):
+        """Recompute every grasp line area and repaint the whole overlay"""
+        bounds = self.overlay_bounds().astype(int).tolist()
+        self.overlay_rects = {
+            grasp_id: QRect(left, top, right - left + 1, bottom - top + 1)
+            for grasp_id, (left, top, right, bottom) in zip(self.grasps.ids.tolist(), bounds)}
+        self.overlay.update()
+
+    def hide_grasp_areas(self):
+        """Remove the blue grasp areas once the annotations change"""
+        if self.show_grasp_areas:
+            self.show_grasp_areas = False
+            self.refresh_overlay()
+
+    def paint_overlay(self, painter, rect):
+        """Paint grasp annotations that intersect rect (overlay coordinates)"""
+        if not self.image_rect or not self.current_pixmap or \
+                self.origin_image.pixmap() is None:
+            return
+        painter.translate(self.image_rect.topLeft())
+        rect = rect.translated(-self.image_rect.topLeft())
+
+        if len(self.grasps):
+            # Grasps whose painted area intersects rect, in row order
+            left, top, right, bottom = self.overlay_bounds().T
+            visible = np.flatnonzero((left <= rect.right()) & (right >= rect.left()) &
+                                     (top <= rect.bottom()) & (bottom >= rect.top()))
+            ids = self.grasps.ids[visible].tolist()
+            marked = self.grasps.has_width()[visible].tolist()
+            axis_lines = np.concatenate(self.grasps.endpoints(visible), axis=1).tolist()
+            perp_lines = np.concatenate(self.grasps.width_endpoints(visible), axis=1).tolist()
+
+            # Blue grasp areas after Generate Preview
+            if self.show_grasp_areas:
+                painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
+                painter.setBrush(Qt.blue)
+                for corners, has_width in zip(self.grasps.area_corners(visible).tolist(), marked):
+                    if has_width:
+                        painter.drawPolygon(QPolygonF([QPointF(x, y) for x, y in corners]))
+                painter.setBrush(Qt.NoBrush)
+
+            # Draw all unselected lines first, selected line last and thicker
+            selected = [i for i, grasp_id in enumerate(ids) if grasp_id == self.current_grasp_id]
+            unselected = [i for i, grasp_id in enumerate(ids) if grasp_id != self.current_grasp_id]
+            for pen_width, indices in ((2, unselected), (4, selected)):
+                for i in indices:
+                    # Draw red center axis
+                    painter.setPen(QPen(Qt.red, pen_width, Qt.SolidLine))
+                    painter.drawLine(QLineF(*axis_lines[i]))
+
+                    # If there's a perpendicular line, draw blue perpendicular line
+                    if marked[i]:
+                        painter.setPen(QPen(Qt.blue, pen_width, Qt.SolidLine))
+                        painter.drawLine(QLineF(*perp_lines[i]))
+
+        # Line being drawn
+        if self.is_drawing and self.start_point and self.rubber_band_end:
+            painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
+            painter.drawLine(self.start_point, self.rubber_band_end)
+
     @staticmethod
     def init_label_image(width, height) -> Tuple[np.ndarray, QImage]:
         # Ensure width and height are integers
@@ -570,220 +472,147 @@ class ShowView():
                         QImage.Format_Grayscale8)
         return image, qimage
 
+    @traced()
     def generate_heatmaps(self):
         """Generate heatmap considering all labeled grasp lines"""
-        if not self.image_rect or not self.grasp_lines:
+        if not self.image_rect or not len(self.grasps):
             return False
 
-        # Get original image size
-        original_height = self.current_pixmap.height()
+        # Preview maps are rasterized at a fraction of the original image size
         original_width = self.current_pixmap.width()
+        original_height = self.current_pixmap.height()
+        shape = preview_shape(original_width, original_height)
+
+        # Rasterize only grasps added, edited or removed since the last preview
+        if self.heatmap_layers is None or self.heatmap_layers.shape != shape:
+            self.heatmap_layers = HeatmapLayers(
+                shape, shape[1] / original_width, shape[0] / original_height)
+        with tracer.span('rasterize', grasps=len(self.grasps)):
+            self.heatmap_layers.sync(self.grasps)
+
+        self.quality_map = self.heatmap_layers.quality_map
+        self.angle_map = self.heatmap_layers.angle_map
+        self.width_map = self.heatmap_layers.width_map
+
+        # Maximum values over lines with width annotation
+        marked = self.grasps.has_width()
+        if marked.any():
+            max_angle = np.abs(self.grasps.axis_angles_degrees()[marked]).max()
+            max_width = self.grasps.widths()[marked].max()
+            print(f"Maximum angle value: {max_angle:.2f}°")
+            print(f"Maximum width value: {max_width:.2f}")
+
+        # Show blue grasp areas on original image
+        self.show_grasp_areas = True
+        self.refresh_overlay()
+
+        # Update preview image display
+        self.update_preview_images()
+        return True
+
+    def export_heatmaps(self, out=None):
+        """Rasterize quality, angle and width maps directly at image resolution"""
+        if self.heatmap_layers is None or not self.current_pixmap:
+            return None
+        # Same layers and brush strokes as the preview, without any resize step
+        return self.heatmap_layers.render(
+            (self.current_pixmap.height(), self.current_pixmap.width()), out=out)
 
-        # Get preview image size
-        preview_height = original_height // 2
-        preview_width = original_width // 2
-
-        # Create heatmap (using preview image size)
-        self.quality_map = np.zeros(
-            (preview_height, preview_width), dtype=np.float32)
-        self.angle_map = np.zeros(
-            (preview_height, preview_width), dtype=np.float32)
-        self.width_map = np.zeros(
-            (preview_height, preview_width), dtype=np.float32)
-
-        # Used to track maximum value
-        max_angle = float('-inf')
-        max_width = float('-inf')
-
-        # Draw blue lines on center axis of original image
-        if self.current_pixmap:
-            painter = QPainter(self.current_pixmap)
-            painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
-
-            # Iterate through all grasp lines
-            for grasp_line in self.grasp_lines:
-                if not grasp_line['perp_line']:  # Skip lines without width annotation
-                    continue
-
-                # Calculate points uniformly distributed on center axis
-                num_points = int(grasp_line['length'])  # One point per pixel
-
-                dx = (grasp_line['end'][0] -
-                      grasp_line['start'][0]) / (num_points - 1)
-                dy = (grasp_line['end'][1] -
-                      grasp_line['start'][1]) / (num_points - 1)
-
-                # Calculate angle between center axis and positive x-axis direction
-                dx_axis = grasp_line['end'][0] - grasp_line['start'][0]
-                dy_axis = -(grasp_line['end'][1] - grasp_line['start'][1])
-                angle_rad = math.atan2(dy_axis, dx_axis)
-                angle_deg = math.degrees(angle_rad)
-
-                # Ensure angle is between -90 and 90 degrees
-                if angle_deg > 90:
-                    angle_deg = angle_deg - 180
-                elif angle_deg < -90:
-                    angle_deg = angle_deg + 180
-
-                # Update maximum angle value
-                max_angle = max(max_angle, abs(angle_deg))
-
-                prev_start_x, prev_start_y = None, None
-                prev_end_x, prev_end_y = None, None
-
-                # Draw vertical blue lines and update heatmap at each point
-                for i in range(num_points):
-                    # Original coordinates
-                    center_x = grasp_line['start'][0] + dx * i
-                    center_y = grasp_line['start'][1] + dy * i
-
-                    # Calculate perpendicular line endpoints (original coordinates)
-                    perp_length = grasp_line['length'] * \
-                        grasp_line['perp_line']['length_ratio']
-                    half_length = perp_length / 2
-                    perp_angle = grasp_line['angle'] + math.pi/2
-
-                    start_x = center_x - half_length * math.cos(perp_angle)
-                    start_y = center_y - half_length * math.sin(perp_angle)
-                    end_x = center_x + half_length * math.cos(perp_angle)
-                    end_y = center_y + half_length * math.sin(perp_angle)
-
-                    # Update maximum width value
-                    max_width = max(max_width, perp_length)
-
-                    # Draw vertical line (original)
-                    painter.drawLine(
-                        int(start_x), int(start_y),
-                        int(end_x), int(end_y)
-                    )
-
-                    # Fill area between two vertical lines
-                    if i > 0:  # From second point, connect previous and current vertical lines
-                        # Create polygon vertex array (scaled to preview image size)
-                        poly_y = np.array([
-                            int(prev_start_y * preview_height / original_height),
-                            int(prev_end_y * preview_height / original_height),
-                            int(end_y * preview_height / original_height),
-                            int(start_y * preview_height / original_height)
-                        ])
-                        poly_x = np.array([
-                            int(prev_start_x * preview_width / original_width),
-                            int(prev_end_x * preview_width / original_width),
-                            int(end_x * preview_width / original_width),
-                            int(start_x * preview_width / original_width)
-                        ])
-
-                        # Use polygon function to get all points inside polygon
-                        rr, cc = polygon(
-                            poly_y, poly_x, shape=(preview_height, preview_width))
-
-                        # Calculate center line points (scaled to preview image size)
-                        center_line_start = np.array([
-                            int((prev_start_x + prev_end_x) / 2 *
-                                preview_width / original_width),
-                            int((prev_start_y + prev_end_y) / 2 *
-                                preview_height / original_height)
-                        ])
-                        center_line_end = np.array([
-                            int((start_x + end_x) / 2 *
-                                preview_width / original_width),
-                            int((start_y + end_y) / 2 *
-                                preview_height / original_height)
-                        ])
-
-                        # Calculate Gaussian value for each point inside polygon
-                        for y, x in zip(rr, cc):
-                            point = np.array([x, y])
-                            # Calculate distance from point to center line
-                            dist = self.point_to_line_distance(
-                                point, center_line_start, center_line_end)
-                            # Calculate Gaussian value (sigma can be adjusted to change distribution width)
-                            sigma = perp_length / \
-                                (4 * original_height /
-                                 preview_height)  # Adjust sigma to fit preview image size
-                            gaussian_value = np.exp(-0.5 *
-                                                    (dist ** 2) / (sigma ** 2))
-
-                            # Update quality map (using Gaussian value)
-                            self.quality_map[y, x] = max(
-                                self.quality_map[y, x], gaussian_value)
-                            # Update other maps (keep unchanged)
-                            self.width_map[y, x] = perp_length
-                            self.angle_map[y, x] = angle_deg
-
-                    # Update previous point coordinates
-                    prev_start_x, prev_start_y = start_x, start_y
-                    prev_end_x, prev_end_y = end_x, end_y
-
-            print(f"Maximum angle value: {angle_deg:.2f}°")
-            print(f"Maximum width value: {perp_length:.2f}")
-
-            painter.end()
-            self.origin_image.setPixmap(
-                self.current_pixmap.scaled(640, 480, Qt.KeepAspectRatio))
-
-            # Update preview image display
-            self.update_preview_images()
-            return True
-
+    @traced()
     def update_preview_images(self):
         """Update preview image display"""
         if all([self.quality_map is not None,
                 self.angle_map is not None,
                 self.width_map is not None]):
 
-            # Convert to uint8 type and apply color mapping
-            quality_colored = self.apply_colormap(self.quality_map)
-            angle_colored = self.apply_colormap(self.angle_map)
-            width_colored = self.apply_colormap(self.width_map)
-
-            # Create QImage and display
             h, w = self.quality_map.shape
+            dirty_rects = self.heatmap_layers.take_dirty_rects() \
+                if self.heatmap_layers is not None else None
+
+            if self.preview_layers is not self.heatmap_layers or \
+                    dirty_rects is None or not self.preview_pixmaps_match(w, h):
+                # New maps: recolor everything and rebuild the color scales
+                self.refresh_preview_images()
+                self.preview_layers = self.heatmap_layers
+                return
+
+            # Only recolor and blit the rectangles that changed
+            for map_name, rect in dirty_rects.items():
+                if rect is not None:
+                    self.blit_preview_rect(map_name, rect)
+
+    def refresh_preview_images(self):
+        """Recolor all three maps into new preview pixmaps"""
+        # Create QImage and display
+        h, w = self.quality_map.shape
+
+        # Apply color mapping into reusable RGB buffers
+        if self.preview_buffers is None or \
+                self.preview_buffers['quality'].shape[:2] != (h, w):
+            self.preview_buffers = {name: np.empty((h, w, 3), dtype=np.uint8)
+                                    for name in ('quality', 'angle', 'width')}
+            self.colormap_scratch = colormap_scratch(h * w)
+            self.blit_buffer = np.empty(h * w * 3, dtype=np.uint8)
+        quality_colored = apply_colormap(
+            self.quality_map, 'quality', out=self.preview_buffers['quality'],
+            scratch=self.colormap_scratch)
+        angle_colored = apply_colormap(
+            self.angle_map, 'angle', out=self.preview_buffers['angle'],
+            scratch=self.colormap_scratch)
+        width_colored = apply_colormap(
+            self.width_map, 'width', out=self.preview_buffers['width'],
+            scratch=self.colormap_scratch)
+
+        quality_qimage = QImage(
+            quality_colored.data, w, h, w * 3, QImage.Format_RGB888)
+        self.quality_image.setPixmap(QPixmap.fromImage(quality_qimage))
+
+        angle_qimage = QImage(angle_colored.data, w,
+                              h, w * 3, QImage.Format_RGB888)
+        self.angle_image.setPixmap(QPixmap.fromImage(angle_qimage))
+
+        width_qimage = QImage(width_colored.data, w,
+                              h, w * 3, QImage.Format_RGB888)
+        self.width_image.setPixmap(QPixmap.fromImage(width_qimage))
+
+        # Create and update color scale
+        self.update_colorbar(h)
+        self.update_width_colorbar(h)
+        self.update_angle_colorbar(h)  # Add
+
+    def preview_pixmaps_match(self, width, height):
+        """Check that every preview label holds a pixmap of the map size"""
+        for label in (self.quality_image, self.angle_image, self.width_image):
+            pixmap = label.pixmap()
+            if pixmap is None or pixmap.width() != width or pixmap.height() != height:
+                return False
+        return True
+
+    def blit_preview_rect(self, map_name, rect):
+        """Recolor one rectangle of one map and paint it into the shown pixmap"""
+        y0, y1, x0, x1 = rect
+        data = {'quality': self.quality_map,
+                'angle': self.angle_map,
+                'width': self.width_map}[map_name]
+        label = {'quality': self.quality_image,
+                 'angle': self.angle_image,
+                 'width': self.width_image}[map_name]
+
+        colored = self.blit_buffer[:(y1 - y0) * (x1 - x0) * 3].reshape(y1 - y0, x1 - x0, 3)
+        apply_colormap(data[y0:y1, x0:x1], map_name, out=colored, scratch=self.colormap_scratch)
+        qimage = QImage(colored.data, x1 - x0, y1 - y0,
+                        (x1 - x0) * 3, QImage.Format_RGB888)
+
+        # The label's own pixmap is the persistent surface, paint into it in place
+        pixmap = label.pixmap()
+        painter = QPainter(pixmap)
+        painter.drawImage(x0, y0, qimage)
+        painter.end()
 
-            quality_qimage = QImage(
-                quality_colored.data, w, h, w * 3, QImage.Format_RGB888)
-            self.quality_image.setPixmap(QPixmap.fromImage(quality_qimage))
-
-            angle_qimage = QImage(angle_colored.data, w,
-                                  h, w * 3, QImage.Format_RGB888)
-            self.angle_image.setPixmap(QPixmap.fromImage(angle_qimage))
-
-            width_qimage = QImage(width_colored.data, w,
-                                  h, w * 3, QImage.Format_RGB888)
-            self.width_image.setPixmap(QPixmap.fromImage(width_qimage))
-
-            # Create and update color scale
-            self.update_colorbar(h)
-            self.update_width_colorbar(h)
-            self.update_angle_colorbar(h)  # Add
-
-    def apply_colormap(self, data):
-        """Apply heatmap color mapping"""
-        # Create colored image
-        colored = np.zeros((data.shape[0], data.shape[1], 3), dtype=np.uint8)
-
-        # Use different normalization methods based on different types of data
-        if data is self.quality_map:
-            # quality_map is already 0-1 range, directly use
-            normalized_data = np.clip(data, 0, 1)
-        elif data is self.angle_map:
-            # angle_map range is -90 to 90, normalize to 0-1
-            normalized_data = (data + 90) / 180
-        elif data is self.width_map:
-            # width_map range is 0 to 150, normalize to 0-1
-            normalized_data = data / 150
-        else:
-            # Default case, assume data is already normalized
-            normalized_data = np.clip(data, 0, 1)
-
-        # Convert to uint8 type
-        data_uint8 = (normalized_data * 255).astype(np.uint8)
-
-        # Apply color mapping (red to blue gradient)
-        colored[..., 0] = data_uint8  # Red channel
-        colored[..., 2] = 255 - data_uint8  # Blue channel
-
-        return colored
+        # Repaint only the changed area (pixmap is centered in the label)
+        offset_x = (label.width() - pixmap.width()) // 2
+        offset_y = (label.height() - pixmap.height()) // 2
+        label.update(offset_x + x0, offset_y + y0, x1 - x0, y1 - y0)
 
     def set_fine_tune_mode(self, mode):
         """Set fine-tuning mode"""
@@ -795,6 +624,13 @@ class ShowView():
         else:
             self.origin_image.setCursor(Qt.ArrowCursor)
 
+    def set_fine_tune_radius(self, radius):
+        """Set fine-tuning brush radius"""
+        self.fine_tune_radius = radius
+        if self.fine_tune_mode in ['up', 'down']:
+            # Refresh circular cursor to the new size
+            self.origin_image.setCursor(self.create_circle_cursor())
+
     def create_circle_cursor(self):
         """Create circular cursor"""
         cursor_size = self.fine_tune_radius * 2
@@ -810,157 +646,57 @@ class ShowView():
 
     def update_colorbar(self, height):
         """Update quality heatmap color scale"""
-        # Create a vertical color gradient bar
-        colorbar = np.zeros((height, 20, 3), dtype=np.uint8)
-        for i in range(height):
-            value = 1.0 - (i / height)  # From top to bottom, value from 1 to 0
-            colorbar[i, :, 0] = int(value * 255)  # Red channel
-            colorbar[i, :, 2] = int((1 - value) * 255)  # Blue channel
-
-        # Add maximum and minimum value labels
-        font = QPainter()
-        colorbar_pixmap = QPixmap(20, height)
-        colorbar_qimage = QImage(
-            colorbar.data, 20, height, 60, QImage.Format_RGB888)
-        colorbar_pixmap.convertFromImage(colorbar_qimage)
-
-        painter = QPainter(colorbar_pixmap)
-        painter.setPen(Qt.black)
-        painter.setFont(QFont('Arial', 8))
-
-        # Draw maximum value at top
-        painter.drawText(0, 10, "1.0")
-        # Draw middle value
-        painter.drawText(0, height//2, "0.5")
-        # Draw minimum value
-        painter.drawText(0, height-2, "0.0")
-
-        painter.end()
-        self.colorbar_label.setPixmap(colorbar_pixmap)
+        self.colorbar_label.setPixmap(self.get_colorbar_pixmap('quality', height))
 
     def update_width_colorbar(self, height):
         """Update width heatmap color scale"""
-        # Create a vertical color gradient bar
-        colorbar = np.zeros((height, 20, 3), dtype=np.uint8)
-        for i in range(height):
-            value = 1.0 - (i / height)  # From top to bottom, value from 1 to 0
-            colorbar[i, :, 0] = int(value * 255)  # Red channel
-            colorbar[i, :, 2] = int((1 - value) * 255)  # Blue channel
-
-        # Add maximum and minimum value labels
-        font = QPainter()
-        colorbar_pixmap = QPixmap(20, height)
-        colorbar_qimage = QImage(
-            colorbar.data, 20, height, 60, QImage.Format_RGB888)
-        colorbar_pixmap.convertFromImage(colorbar_qimage)
-
-        painter = QPainter(colorbar_pixmap)
-        painter.setPen(Qt.black)
-        painter.setFont(QFont('Arial', 8))
-
-        # Draw maximum value at top
-        painter.drawText(0, 10, "150")
-        # Draw middle value
-        painter.drawText(0, height//2, "75")
-        # Draw minimum value
-        painter.drawText(0, height-2, "0")
-
-        painter.end()
-        self.width_colorbar_label.setPixmap(colorbar_pixmap)
+        self.width_colorbar_label.setPixmap(self.get_colorbar_pixmap('width', height))
 
     def update_angle_colorbar(self, height):
         """Update angle heatmap color scale"""
-        # Create a vertical color gradient bar
-        colorbar = np.zeros((height, 20, 3), dtype=np.uint8)
-        for i in range(height):
-            value = 1.0 - (i / height)  # From top to bottom, value from 1 to 0
-            colorbar[i, :, 0] = int(value * 255)  # Red channel
-            colorbar[i, :, 2] = int((1 - value) * 255)  # Blue channel
+        self.angle_colorbar_label.setPixmap(self.get_colorbar_pixmap('angle', height))
 
-        # Add maximum and minimum value labels
-        font = QPainter()
+    def get_colorbar_pixmap(self, map_type, height):
+        """Color scale pixmap with value labels, cached by map type, height and colormap"""
+        colormap = MAP_COLORMAPS[map_type]
+        key = (map_type, height, colormap)
+        if key in self.colorbar_cache:
+            return self.colorbar_cache[key]
+
+        # Create a vertical color gradient bar
+        colorbar = colorbar_gradient(map_type, height, 20, colormap)
         colorbar_pixmap = QPixmap(20, height)
         colorbar_qimage = QImage(
             colorbar.data, 20, height, 60, QImage.Format_RGB888)
         colorbar_pixmap.convertFromImage(colorbar_qimage)
 
+        # Add maximum and minimum value labels
         painter = QPainter(colorbar_pixmap)
         painter.setPen(Qt.black)
         painter.setFont(QFont('Arial', 8))
 
+        max_text, mid_text, min_text = COLORBAR_LABELS[map_type]
         # Draw maximum value at top
-        painter.drawText(0, 10, "90°")
+        painter.drawText(0, 10, max_text)
         # Draw middle value
-        painter.drawText(0, height//2, "0°")
+        painter.drawText(0, height//2, mid_text)
         # Draw minimum value
-        painter.drawText(0, height-2, "-90°")
+        painter.drawText(0, height-2, min_text)
 
         painter.end()
-        self.angle_colorbar_label.setPixmap(colorbar_pixmap)
-
-    def point_in_quadrilateral(self, point, quad_points):
-        """
-        Check if point is inside quadrilateral
-        point: Point to check [x, y]
-        quad_points: Four vertices of quadrilateral [[x1,y1], [x2,y2], [x3,y3], [x4,y4]]
-        """
-        def sign(p1, p2, p3):
-            return (p1[0] - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (p1[1] - p3[1])
-
-        d1 = sign(point, quad_points[0], quad_points[1])
-        d2 = sign(point, quad_points[1], quad_points[2])
-        d3 = sign(point, quad_points[2], quad_points[3])
-        d4 = sign(point, quad_points[3], quad_points[0])
-
-        has_neg = (d1 < 0) or (d2 < 0) or (d3 < 0) or (d4 < 0)
-        has_pos = (d1 > 0) or (d2 > 0) or (d3 > 0) or (d4 > 0)
-
-        return not (has_neg and has_pos)
-
-    def point_to_line_distance(self, point, line_start, line_end):
-        """Calculate distance from point to line segment"""
-        if np.array_equal(line_start, line_end):
-            return np.linalg.norm(point - line_start)
-
-        line_vec = line_end - line_start
-        point_vec = point - line_start
-        line_length = np.linalg.norm(line_vec)
-        line_unit_vec = line_vec / line_length
-        projection_length = np.dot(point_vec, line_unit_vec)
-
-        if projection_length < 0:
-            return np.linalg.norm(point - line_start)
-        elif projection_length > line_length:
-            return np.linalg.norm(point - line_end)
-        else:
-            projection = line_start + line_unit_vec * projection_length
-            return np.linalg.norm(point - projection)
+        self.colorbar_cache[key] = colorbar_pixmap
+        return colorbar_pixmap
 
+    @traced()
     def update_quality_value(self, pos):
         """Update value of quality map"""
-        # Convert to preview image coordinates
-        preview_x = int(pos.x() / 2)
-        preview_y = int(pos.y() / 2)
-
         # Update quality map
-        if self.quality_map is not None:
-            height, width = self.quality_map.shape
-            radius = self.fine_tune_radius // 2  # Preview image radius
-
-            # Update value in circular area
-            for y in range(max(0, preview_y - radius), min(height, preview_y + radius)):
-                for x in range(max(0, preview_x - radius), min(width, preview_x + radius)):
-                    # Calculate distance to center
-                    dist = math.sqrt((x - preview_x) ** 2 + (y - preview_y)**2)
-                    if dist <= radius:
-                        # Use Gaussian decay
-                        factor = math.exp(-(dist**2)/(2*(radius/2)**2))
-                        if self.fine_tune_mode == 'up':
-                            self.quality_map[y, x] = min(
-                                1.0, self.quality_map[y, x] + self.fine_tune_strength * factor)
-                        else:  # down
-                            self.quality_map[y, x] = max(
-                                0.0, self.quality_map[y, x] - self.fine_tune_strength * factor)
+        if self.quality_map is not None and self.heatmap_layers is not None:
+            delta = self.fine_tune_strength if self.fine_tune_mode == 'up' \
+                else -self.fine_tune_strength
+            # Strokes are kept in image coordinates so the export can replay them
+            self.heatmap_layers.add_stroke(
+                pos.x(), pos.y(), self.fine_tune_radius, delta)
 
             # Update preview image display
             self.update_preview_images()
@@ -0,0 +1,336 @@
+import hashlib
+import io
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+from PyQt5.QtCore import Qt, QObject, QSize, QBuffer, QByteArray, QIODevice, QTimer, pyqtSignal
+
+from GraspCore.LabelWriter import sync_file
+
+
+THUMBNAIL_SIZE = QSize(48, 36)
+PACK_MAGIC = b'GTHUMB\0\1'
+PACK_EXTENSION = '.gthumbs'
+
+# Pack layout: magic, JPEG records back to back, index (.npy bytes), then a
+# footer holding the index offset and length followed by the magic again
+_FOOTER = struct.Struct('<QQ8s')
+_INDEX_FIELDS = [('size', np.int64), ('mtime', np.int64), ('offset', np.int64), ('length', np.int64)]
+
+
+def default_cache_folder():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'grasp-annotation-tool', 'thumbnails')
+
+
+def make_thumbnail(file_path, size=THUMBNAIL_SIZE):
+    """(file size, mtime_ns, JPEG bytes or None) of one image, safe off the GUI thread"""
+    stat = os.stat(file_path)
+    reader = QImageReader(file_path)
+    image_size = reader.size()
+    if image_size.isValid():
+        reader.setScaledSize(image_size.scaled(size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return stat.st_size, stat.st_mtime_ns, None
+    if not image_size.isValid():
+        image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, 'JPEG', 85)
+    buffer.close()
+    return stat.st_size, stat.st_mtime_ns, bytes(data)
+
+
+def _encode_index(entries):
+    """Index bytes (.npy) of {file name: (size, mtime_ns, offset, length)}"""
+    names = list(entries)
+    index = np.zeros(len(names), dtype=[('name', f'U{max(map(len, names), default=1)}')] +
+                     _INDEX_FIELDS)
+    index['name'] = names
+    for i, field in enumerate(('size', 'mtime', 'offset', 'length')):
+        index[field] = [entry[i] for entry in entries.values()]
+    encoded = io.BytesIO()
+    np.save(encoded, index)
+    return encoded.getvalue()
+
+
+class ThumbnailPack():
+    """
+    Thumbnails of one image folder in a single file
+    Entries are keyed by file name and hold the file size and mtime they
+    were made from. New thumbnails are kept in memory until flush(), which
+    appends them and a new index at the end of the file, fsyncs, and only
+    then writes the footer pointing at that index: a footer never refers to
+    data that is not on disk. A pack whose last footer does not check out
+    (a crash mid flush) is discarded and rebuilt. Once superseded records
+    and indexes outweigh the live records, flush() rewrites the pack to a
+    temp file and renames it over the old one instead.
+    flush() may run on a worker thread while lookup() and add() are called.
+    """
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.entries = {}  # file name -> (size, mtime_ns, offset, length) in the pack file
+        self.added = {}  # file name -> (size, mtime_ns, JPEG bytes) not written yet
+        self._file = None  # Read handle for lookup()
+        self._end = 0  # Size of the pack file as last written or loaded
+        self._lock = threading.Lock()  # entries, added and the read handle
+        self._flush_lock = threading.Lock()  # One flush at a time
+        if os.path.exists(path):
+            try:
+                self._load()
+            except (OSError, ValueError, struct.error):
+                if self._file is not None:
+                    self._file.close()
+                self.entries = {}
+                self._file = None
+                self._end = 0
+
+    @property
+    def dirty(self):
+        return bool(self.added)
+
+    def _load(self):
+        self._file = open(self.path, 'rb')
+        file_size = os.path.getsize(self.path)
+        if file_size < len(PACK_MAGIC) + _FOOTER.size or self._file.read(len(PACK_MAGIC)) != PACK_MAGIC:
+            raise ValueError(f"{self.path} is not a thumbnail pack")
+        self._file.seek(file_size - _FOOTER.size)
+        index_offset, index_length, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        if magic != PACK_MAGIC or index_offset + index_length + _FOOTER.size != file_size:
+            raise ValueError(f"{self.path} has no valid index")
+        self._file.seek(index_offset)
+        index = np.load(io.BytesIO(self._file.read(index_length)), allow_pickle=False)
+        self.entries = dict(zip(index['name'].tolist(), zip(
+            index['size'].tolist(), index['mtime'].tolist(),
+            index['offset'].tolist(), index['length'].tolist())))
+        self._end = file_size
+
+    def lookup(self, name, size, mtime):
+        """JPEG bytes of a thumbnail made from this exact file version, or None"""
+        with self._lock:
+            added = self.added.get(name)
+            if added is not None:
+                return added[2] if added[:2] == (size, mtime) else None
+            entry = self.entries.get(name)
+            if entry is None or entry[0] != size or entry[1] != mtime:
+                return None
+            self._file.seek(entry[2])
+            return self._file.read(entry[3])
+
+    def add(self, name, size, mtime, data):
+        with self._lock:
+            self.added[name] = (size, mtime, data)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                added = dict(self.added)
+                kept = {name: entry for name, entry in self.entries.items() if name not in added}
+            if not added:
+                return
+
+            live = sum(entry[3] for entry in kept.values()) + \
+                sum(len(record[2]) for record in added.values())
+            if self._file is None or self._end - len(PACK_MAGIC) - live > live:
+                entries, end = self._rewrite(kept, added)
+            else:
+                entries, end = self._append(kept, added)
+
+            with self._lock:
+                for name, record in added.items():
+                    if self.added.get(name) is record:
+                        del self.added[name]  # Not replaced while writing
+                self.entries = entries
+                self._end = end
+
+    def _append(self, kept, added):
+        """Append records, index and footer; returns (entries, file size)"""
+        entries = dict(kept)
+        with open(self.path, 'r+b') as f:
+            f.seek(self._end)
+            for name, (size, mtime, data) in added.items():
+                entries[name] = (size, mtime, f.tell(), len(data))
+                f.write(data)
+            index = _encode_index(entries)
+            index_offset = f.tell()
+            f.write(index)
+            f.flush()
+            os.fsync(f.fileno())
+            # The footer goes last, once everything it points at is on disk
+            f.write(_FOOTER.pack(index_offset, len(index), PACK_MAGIC))
+            f.truncate()  # Drop the tail of a flush that failed part way
+            f.flush()
+            os.fsync(f.fileno())
+            return entries, f.tell()
+
+    def _rewrite(self, kept, added):
+        """Write the live records to a temp file and swap it in; returns (entries, file size)"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        entries = {}
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp, 'wb') as f:
+                f.write(PACK_MAGIC)
+                if kept:
+                    with open(self.path, 'rb') as old:
+                        for name, (size, mtime, offset, length) in kept.items():
+                            old.seek(offset)
+                            entries[name] = (size, mtime, f.tell(), length)
+                            f.write(old.read(length))
+                for name, (size, mtime, data) in added.items():
+                    entries[name] = (size, mtime, f.tell(), len(data))
+                    f.write(data)
+                index = _encode_index(entries)
+                index_offset = f.tell()
+                f.write(index)
+                f.write(_FOOTER.pack(index_offset, len(index), PACK_MAGIC))
+                end = f.tell()
+            sync_file(temp)
+
+            with self._lock:
+                # Windows cannot replace a file that is open
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                try:
+                    os.replace(temp, self.path)
+                finally:
+                    if os.path.exists(self.path):
+                        self._file = open(self.path, 'rb')
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        sync_file(os.path.dirname(self.path))
+        return entries, end
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+
+
+class ThumbnailCache(QObject):
+    """
+    Thumbnails for the file list, persisted in one pack per image folder
+    get() answers from memory or the folder's pack; misses are made on a
+    worker pool and announced through thumbnail_ready, so the list only
+    asks for rows as they scroll into view.
+    """
+
+    thumbnail_ready = pyqtSignal(str)  # image path
+    _made = pyqtSignal(str, object)  # Worker result, delivered on the GUI thread
+
+    MAX_PIXMAPS = 2048
+    FLUSH_DELAY = 2000  # ms after the last new thumbnail before packs are written
+
+    def __init__(self, cache_folder=None, workers=2, parent=None) -> None:
+        super().__init__(parent)
+        self.cache_folder = cache_folder or default_cache_folder()
+        self._packs = {}  # image folder -> ThumbnailPack
+        self._pixmaps = OrderedDict()  # image path -> QPixmap, least recently used first
+        self._pending = {}  # image path -> Future
+        self._failed = {}  # image path -> (size, mtime_ns) of the version that did not decode
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnails')
+        self._made.connect(self._store)
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def get(self, file_path):
+        """QPixmap thumbnail, or None while it is being made"""
+        pixmap = self._pixmaps.get(file_path)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(file_path)
+            return pixmap
+        if file_path in self._pending:
+            return None
+
+        folder, name = os.path.split(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if self._failed.get(file_path) == (stat.st_size, stat.st_mtime_ns):
+            return None  # Retried once the file changes, e.g. when a copy finishes
+        data = self._pack(folder).lookup(name, stat.st_size, stat.st_mtime_ns)
+        if data is not None:
+            pixmap = QPixmap.fromImage(QImage.fromData(data, 'JPEG'))
+            self._remember(file_path, pixmap)
+            return pixmap
+
+        future = self._pending[file_path] = self._pool.submit(make_thumbnail, file_path)
+        future.add_done_callback(lambda future: self._made.emit(file_path, future))
+        return None
+
+    def cancel_pending(self):
+        """Drop queued thumbnails, e.g. when the list is replaced"""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def flush(self):
+        """Write the new thumbnails of every pack on the worker pool"""
+        for pack in self._packs.values():
+            if pack.dirty:
+                self._pool.submit(self._flush_pack, pack)
+
+    @staticmethod
+    def _flush_pack(pack):
+        try:
+            pack.flush()
+        except OSError:
+            pass  # Cache folder not writable, keep the thumbnails in memory only
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for pack in self._packs.values():
+            try:
+                pack.close()
+            except OSError:
+                pass
+        self._packs.clear()
+        self._failed.clear()
+
+    def _pack(self, folder):
+        pack = self._packs.get(folder)
+        if pack is None:
+            digest = hashlib.sha1(os.path.abspath(folder).encode('utf-8', 'surrogateescape')).hexdigest()
+            pack = self._packs[folder] = ThumbnailPack(
+                os.path.join(self.cache_folder, digest + PACK_EXTENSION))
+        return pack
+
+    def _store(self, file_path, future):
+        if self._pending.get(file_path) is not future:
+            return  # Cancelled, the list was replaced meanwhile
+        del self._pending[file_path]
+        try:
+            size, mtime, data = future.result()
+        except Exception:
+            return  # Unreadable, e.g. removed meanwhile; asked again on the next get()
+        if data is None:
+            self._failed[file_path] = (size, mtime)
+            return
+
+        folder, name = os.path.split(file_path)
+        self._pack(folder).add(name, size, mtime, data)
+        self._flush_timer.start(self.FLUSH_DELAY)
+        self._remember(file_path, QPixmap.fromImage(QImage.fromData(data, 'JPEG')))
+        self.thumbnail_ready.emit(file_path)
+
+    def _remember(self, file_path, pixmap):
+        self._pixmaps[file_path] = pixmap
+        while len(self._pixmaps) > self.MAX_PIXMAPS:
+            self._pixmaps.popitem(last=False)
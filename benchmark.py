@@ -0,0 +1,384 @@
+"""
+Micro-benchmarks of the annotation hot paths on synthetic scenes
+
+    python benchmark.py [--sizes WxH ...] [--grasps N ...] [--repeat N]
+        [--seed N] [--only PATTERN ...] [--no-gui] [--output FILE]
+        [--compare BASELINE]
+
+A scene is a set of random grasps (position, angle, length, width) plus a
+few brush strokes on an image of a given size. core.* benchmarks call
+GraspCore directly at the image size; gui.* benchmarks drive an offscreen
+ShowView and ActionView, where the image is shown scaled to fit 640x480 like
+in the tool. Times are ms per call over at least --repeat calls; peak is the
+tracemalloc peak of one more call, so it counts Python and NumPy memory but
+not Qt's. Results are written as JSON; --compare prints the change of the
+median time against an earlier results file.
+"""
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from GraspCore.Colormap import apply_colormap, colorbar_gradient, colormap_scratch
+from GraspCore.GraspSet import GraspSet
+from GraspCore.Heatmap import HeatmapLayers, preview_shape, rasterize_grasps
+from GraspCore.LabelRegenerate import parse_image_size
+from GraspCore.LabelWriter import LabelWriter, render_label
+from GraspCore.SpatialIndex import SegmentGrid
+
+
+MIN_TIME = 0.2  # Seconds each benchmark runs for at least
+MAX_CALLS = 1000
+STROKE_COUNT = 20
+
+
+def make_scene(width, height, count, seed=0):
+    """(GraspSet, strokes) with count random grasps on a width x height image"""
+    rng = np.random.default_rng(seed)
+    short_side = min(width, height)
+    centers = rng.uniform((0, 0), (width, height), (count, 2))
+    lengths = rng.uniform(0.05, 0.25, count) * short_side
+    angles = rng.uniform(-np.pi, np.pi, count)
+    ratios = rng.uniform(0.1, 0.6, count)
+    half = (lengths / 2)[:, np.newaxis] * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+
+    grasps = GraspSet(count)
+    for start, end, ratio in zip((centers - half).tolist(), (centers + half).tolist(),
+                                 ratios.tolist()):
+        grasps.add(start, end, ratio)
+    strokes = [(float(x), float(y), 10, 0.1 if i % 2 else -0.1)
+               for i, (x, y) in enumerate(rng.uniform((0, 0), (width, height), (STROKE_COUNT, 2)))]
+    return grasps, strokes
+
+
+def random_points(width, height, seed=0, count=256):
+    return np.random.default_rng(seed + 1).uniform((0, 0), (width, height), (count, 2)).tolist()
+
+
+def measure(run, setup=None, repeat=7):
+    """Per-call times in seconds and the traced peak of one call in bytes"""
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeat or \
+            (time.perf_counter() - started < MIN_TIME and len(times) < MAX_CALLS):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def core_benchmarks(width, height, grasps, strokes, points, folder, writer):
+    """
+    (name, run, setup) of the Qt-free hot paths at image size
+    The grasps are never modified; benchmarks that edit work on a copy.
+    writer is the LabelWriter the save benchmark uses, the caller shuts it down.
+    """
+    shape = preview_shape(width, height)
+    scale_x, scale_y = shape[1] / width, shape[0] / height
+    full_maps = tuple(np.empty((height, width), dtype=np.float32) for _ in range(3))
+    points_iter = iter(())
+
+    def next_point():
+        nonlocal points_iter
+        point = next(points_iter, None)
+        if point is None:
+            points_iter = iter(points)
+            point = next(points_iter)
+        return point
+
+    # Preview layers, as generate_heatmaps() keeps them
+    state = {}
+
+    def fresh_layers():
+        state['layers'] = HeatmapLayers(shape, scale_x, scale_y)
+
+    def synced_layers(key):
+        """Layers synced to the scene, owned by one benchmark so others see it unchanged"""
+        if key not in state:
+            state[key] = HeatmapLayers(shape, scale_x, scale_y)
+            state[key].sync(grasps)
+        state['layers'] = state[key]
+
+    def edit_one_grasp():
+        if 'edited' not in state:
+            state['edited'] = GraspSet.from_array(grasps.to_array())
+        synced_layers('edit')
+        edited = state['edited']
+        grasp_id = int(edited.ids[len(edited) // 2])
+        row = edited.row_of(grasp_id)
+        edited.set_width_ratio(grasp_id, 0.35 if edited.width_ratios[row] != 0.35 else 0.45)
+
+    def brush():
+        x, y = next_point()
+        state['layers'].add_stroke(x, y, 10, 0.1)
+
+    def colormap():
+        layers = state['layers']
+        for name in HeatmapLayers.MAP_NAMES:
+            apply_colormap(getattr(layers, name + '_map'), name, out=buffers[name], scratch=scratch)
+
+    grid = SegmentGrid()
+    starts, ends = grasps.endpoints()
+    for grasp_id, start, end in zip(grasps.ids.tolist(), starts.tolist(), ends.tolist()):
+        grid.insert(grasp_id, start, end, grasp_id)
+
+    buffers = {name: np.empty(shape + (3,), dtype=np.uint8) for name in HeatmapLayers.MAP_NAMES}
+    scratch = colormap_scratch(shape[0] * shape[1])
+    label_path = os.path.join(folder, 'labels', 'core.glabel')
+    source_path = os.path.join(folder, 'images', 'scene.png')
+    return [
+        ('core.rasterize_grasps', lambda: rasterize_grasps(grasps, (height, width),
+                                                           strokes=strokes, out=full_maps), None),
+        ('core.layers_sync_full', lambda: state['layers'].sync(grasps), fresh_layers),
+        ('core.layers_sync_edit', lambda: state['layers'].sync(state['edited']), edit_one_grasp),
+        ('core.brush_stroke', brush, lambda: synced_layers('brush')),
+        ('core.apply_colormap', colormap, lambda: synced_layers('colormap')),
+        ('core.colorbar_gradient', lambda: [colorbar_gradient(name, shape[0])
+                                            for name in HeatmapLayers.MAP_NAMES], None),
+        ('core.nearest_grasp', lambda: grid.nearest(next_point(), 5), None),
+        ('core.render_label', lambda: render_label(label_path, grasps, strokes,
+                                                   (width, height)), None),
+        ('core.render_label_uint8', lambda: render_label(label_path, grasps, strokes,
+                                                         (width, height), 'uint8'), None),
+        ('core.label_writer_save', lambda: writer.save(label_path, source_path, grasps, strokes,
+                                                       (width, height)).result(), None),
+    ]
+
+
+def gui_benchmarks(width, height, grasps, strokes, points, folder):
+    """(name, run, setup) of the widget methods, with the scene scaled to the view"""
+    from PyQt5.QtCore import QPoint, QSize, Qt
+    from PyQt5.QtGui import QPixmap
+    from PyQt5.QtWidgets import QApplication
+    from QtPage.ActionView import ActionView
+    from QtPage.ImageCache import VIEW_SIZE
+    from QtPage.ShowView import ShowView
+
+    app = QApplication.instance() or QApplication([])
+    view_size = QSize(width, height).scaled(VIEW_SIZE, Qt.KeepAspectRatio)
+    scale_x, scale_y = view_size.width() / width, view_size.height() / height
+
+    show_view = ShowView()
+    action_view = ActionView(show_view)
+    pixmap = QPixmap(view_size)
+    pixmap.fill(Qt.gray)
+    show_view.current_pixmap = pixmap
+    show_view.current_file_path = os.path.join(folder, 'images', 'scene.png')
+    show_view.origin_image.setPixmap(pixmap)
+    scene = grasps.transformed(scale_x, scale_y)  # Never modified, edits go to a copy
+    edited = GraspSet.from_array(scene.to_array())
+    show_view.grasps = scene
+    show_view.update_image_rect()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        show_view.generate_heatmaps()
+    view_strokes = [(x * scale_x, y * scale_y, radius, delta) for x, y, radius, delta in strokes]
+    show_view.heatmap_layers.strokes.extend(view_strokes)
+    view_points = [(x * scale_x, y * scale_y) for x, y in points]
+    points_iter = iter(())
+
+    def next_point():
+        nonlocal points_iter
+        point = next(points_iter, None)
+        if point is None:
+            points_iter = iter(view_points)
+            point = next(points_iter)
+        return point
+
+    def use_scene():
+        if show_view.grasps is not scene:
+            show_view.grasps = scene
+            show_view.heatmap_layers.sync(scene)
+
+    def fresh_layers():
+        use_scene()
+        show_view.heatmap_layers = None
+
+    def edit_one_grasp():
+        show_view.grasps = edited
+        grasp_id = int(edited.ids[len(edited) // 2])
+        row = edited.row_of(grasp_id)
+        edited.set_width_ratio(grasp_id, 0.35 if edited.width_ratios[row] != 0.35 else 0.45)
+
+    def brush_mode():
+        use_scene()
+        show_view.fine_tune_mode = 'up'
+
+    def brush():
+        x, y = next_point()
+        show_view.update_quality_value(QPoint(int(x), int(y)))
+
+    def full_preview():
+        show_view.preview_layers = None
+
+    def colorbars():
+        height = show_view.quality_map.shape[0]
+        show_view.update_colorbar(height)
+        show_view.update_width_colorbar(height)
+        show_view.update_angle_colorbar(height)
+
+    def new_writer():
+        use_scene()
+        action_view.label_writer.shutdown()
+        action_view.label_writer = LabelWriter()
+        # Only the scene's strokes, not the ones the brush benchmark added
+        show_view.heatmap_layers.strokes[:] = view_strokes
+
+    def save():
+        # From the click until the background write has landed
+        action_view.handle_save()
+        action_view.label_writer.shutdown()
+
+    def process(run):
+        def run_and_paint():
+            run()
+            app.processEvents()
+        return run_and_paint
+
+    return [
+        ('gui.generate_heatmaps', process(show_view.generate_heatmaps), fresh_layers),
+        ('gui.generate_heatmaps_edit', process(show_view.generate_heatmaps), edit_one_grasp),
+        ('gui.update_quality_value', process(brush), brush_mode),
+        ('gui.update_preview_images', process(show_view.update_preview_images), full_preview),
+        ('gui.colorbars', colorbars, show_view.colorbar_cache.clear),
+        ('gui.find_nearest_line', lambda: show_view.find_nearest_line(next_point()), use_scene),
+        ('gui.handle_save', save, new_writer),
+    ]
+
+
+def summarize(name, width, height, count, times, peak, log=print):
+    """Result dictionary of one benchmark run, logged as one line"""
+    times = np.asarray(times) * 1000
+    result = {
+        'benchmark': name, 'width': width, 'height': height, 'grasps': count,
+        'calls': len(times), 'min_ms': float(times.min()),
+        'median_ms': float(np.median(times)), 'mean_ms': float(times.mean()),
+        'p95_ms': float(np.percentile(times, 95)), 'max_ms': float(times.max()),
+        'peak_bytes': int(peak),
+    }
+    log(f"{name:28s} {width}x{height} {count:5d} grasps  "
+        f"median {result['median_ms']:9.3f} ms  min {result['min_ms']:9.3f}  "
+        f"p95 {result['p95_ms']:9.3f}  peak {peak / 1024:9.1f} KB")
+    return result
+
+
+def run_benchmarks(sizes, counts, repeat=7, seed=0, patterns=None, gui=True, log=print):
+    """List of result dictionaries, one per benchmark, image size and grasp count"""
+    results = []
+    folder = tempfile.mkdtemp(prefix='grasp-benchmark-')
+    try:
+        os.makedirs(os.path.join(folder, 'images'))
+        os.makedirs(os.path.join(folder, 'labels'))
+        for width, height in sizes:
+            # The save path hashes the source image, give it a typical compressed size
+            with open(os.path.join(folder, 'images', 'scene.png'), 'wb') as f:
+                f.write(os.urandom(width * height // 4))
+            for count in counts:
+                grasps, strokes = make_scene(width, height, count, seed)
+                points = random_points(width, height, seed)
+                writer = LabelWriter()
+                try:
+                    benchmarks = core_benchmarks(width, height, grasps, strokes, points, folder,
+                                                 writer)
+                    if gui:
+                        benchmarks += gui_benchmarks(width, height, grasps, strokes, points,
+                                                     folder)
+                    for name, run, setup in benchmarks:
+                        if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+                            continue
+                        with open(os.devnull, 'w') as devnull, \
+                                contextlib.redirect_stdout(devnull):
+                            # The widgets print diagnostics on every preview
+                            times, peak = measure(run, setup, repeat)
+                        results.append(summarize(name, width, height, count, times, peak, log))
+                finally:
+                    writer.shutdown(wait=True)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path, log=print):
+    """Print the median time change of every result also found in the baseline file"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['benchmark'], r['width'], r['height'], r['grasps']): r
+                    for r in json.load(f)['results']}
+    log(f"Median time against {baseline_path} (below 1.00x is faster):")
+    for result in results:
+        key = (result['benchmark'], result['width'], result['height'], result['grasps'])
+        if key in baseline:
+            ratio = result['median_ms'] / baseline[key]['median_ms']
+            log(f"{key[0]:28s} {key[1]}x{key[2]} {key[3]:5d} grasps  "
+                f"{baseline[key]['median_ms']:9.3f} -> {result['median_ms']:9.3f} ms  "
+                f"{ratio:5.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the annotation hot paths')
+    parser.add_argument('--sizes', nargs='+', type=parse_image_size,
+                        default=[(640, 480), (1280, 960)], help='image sizes as WIDTHxHEIGHT')
+    parser.add_argument('--grasps', nargs='+', type=int, default=[1, 10, 100, 1000],
+                        help='grasp counts per scene')
+    parser.add_argument('--repeat', type=int, default=7, help='minimum calls per benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='scene random seed')
+    parser.add_argument('--only', nargs='+', metavar='PATTERN',
+                        help='run benchmarks matching these names, e.g. "core.*" or "*save*"')
+    parser.add_argument('--no-gui', action='store_true', help='skip the gui.* benchmarks')
+    parser.add_argument('--output', help='results file (default: benchmark-DATE-TIME.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='earlier results file to compare with')
+    args = parser.parse_args(argv)
+
+    if not args.no_gui:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    results = run_benchmarks(args.sizes, args.grasps, args.repeat, args.seed, args.only,
+                             not args.no_gui)
+
+    output = args.output or time.strftime('benchmark-%Y%m%d-%H%M%S.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'settings': vars(args), 'results': results},
+                  f, indent=1)
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
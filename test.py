@@ -1,16 +1,17 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize
+from GraspCore import Colormap
+from GraspCore.LabelFile import CHANNELS, open_label
 
 
 
 def read_and_visualize_dat(file_path):
     try:
-        # Read data
-        data = np.fromfile(file_path, dtype=np.float32)
-        data = data.reshape((480, 640, 3))
-
-        # Reshape data to (480, 640, 3)
+        # Read data, shape and channel order come from the file header
+        header, data = open_label(file_path, channels=CHANNELS)
         print(f"Data shape: {data.shape}")
+        print(f"Source image: {header['source']['name']}")
 
         # Create a 1x3 subplot
         fig, axes = plt.subplots(1, 3, figsize=(15, 5))
@@ -29,10 +30,11 @@ def read_and_visualize_dat(file_path):
         angle_data = data[:, :, 1]
         # Ensure angle data is within -90 to 90 degrees range
         angle_data = np.clip(angle_data, -90, 90)
-        im1 = axes[1].imshow(angle_data, cmap='RdYlBu', vmin=-90, vmax=90)
+        axes[1].imshow(Colormap.apply_colormap(angle_data, 'angle'))
         axes[1].set_title('Grasp Angle Heatmap')
         axes[1].axis('off')
-        cbar1 = plt.colorbar(im1, ax=axes[1])
+        cbar1 = plt.colorbar(plt.cm.ScalarMappable(
+            norm=Normalize(-90, 90), cmap=Colormap.MAP_COLORMAPS['angle']), ax=axes[1])
         # Set evenly distributed angle ticks
         cbar1.set_ticks([-90, -45, 0, 45, 90])
         cbar1.set_ticklabels(['-90°', '-45°', '0°', '45°', '90°'])
@@ -43,10 +45,11 @@ def read_and_visualize_dat(file_path):
         # Process width data: take absolute value and limit range to 0-150mm
         width_data = np.abs(width_data)  # Take absolute value
         width_data = np.clip(width_data, 0, 150)  # Limit range
-        im2 = axes[2].imshow(width_data, cmap='YlGnBu', vmin=0, vmax=150)
+        axes[2].imshow(Colormap.apply_colormap(width_data, 'width'))
         axes[2].set_title('Grasp Width Heatmap')
         axes[2].axis('off')
-        cbar2 = plt.colorbar(im2, ax=axes[2])
+        cbar2 = plt.colorbar(plt.cm.ScalarMappable(
+            norm=Normalize(0, 150), cmap=Colormap.MAP_COLORMAPS['width']), ax=axes[2])
         # Set fixed tick range
         cbar2.set_ticks([0, 37.5, 75, 112.5, 150])
         cbar2.set_ticklabels(['0', '37.5', '75', '112.5', '150'])
@@ -65,49 +68,36 @@ def apply_colormap(data, type):
     """Apply heatmap color mapping"""
     if type == 'quality':
         # quality_map is already in 0-1 range, use directly
-        normalized_data = np.clip(data, 0, 1)
-        # Use YlOrRd colormap (from light yellow to deep red)
-        cmap = plt.cm.YlOrRd
-        colored = (cmap(normalized_data)[:, :, :3] * 255).astype(np.uint8)
-        return colored, 'YlOrRd', [0, 0.5, 1], ['0', '0.5', '1'], 'Grasp Quality'
-        
+        # YlOrRd colormap (from light yellow to deep red)
+        colored = Colormap.apply_colormap(data, 'quality')
+        return colored, Colormap.MAP_COLORMAPS['quality'], [0, 0.5, 1], ['0', '0.5', '1'], 'Grasp Quality'
+
     elif type == 'angle':
-        # Convert angle to radians
-        angle_rad = np.deg2rad(data)
-        # Calculate sin and cos
-        sin_data = (np.sin(angle_rad) + 1) / 2  # Normalize to 0-1
-        cos_data = (np.cos(angle_rad) + 1) / 2  # Normalize to 0-1
-        
-        # Use matplotlib colormap to generate colors
-        sin_cmap = plt.cm.RdBu_r  # Use reversed red-blue map
-        cos_cmap = plt.cm.GnBu_r  # Use reversed green-blue map
-        sin_colors = (sin_cmap(sin_data)[:, :, :3] * 255).astype(np.uint8)
-        cos_colors = (cos_cmap(cos_data)[:, :, :3] * 255).astype(np.uint8)
-        
-        return (sin_colors, cos_colors), ('RdBu_r', 'GnBu_r'), ([0, 0.5, 1], [0, 0.5, 1]), (['-1', '0', '1'], ['-1', '0', '1']), ('Sin Value', 'Cos Value')
-        
+        # sin and cos of the angle, each spread over -1 to 1
+        # RdBu_r (reversed red-blue) and GnBu_r (reversed green-blue) colormaps
+        sin_colors = Colormap.apply_colormap(data, 'sin')
+        cos_colors = Colormap.apply_colormap(data, 'cos')
+
+        return (sin_colors, cos_colors), (Colormap.MAP_COLORMAPS['sin'], Colormap.MAP_COLORMAPS['cos']), ([0, 0.5, 1], [0, 0.5, 1]), (['-1', '0', '1'], ['-1', '0', '1']), ('Sin Value', 'Cos Value')
+
     elif type == 'width':
-        # width_map range is 0 to 150, use fixed range normalization
-        normalized_data = np.clip(data / 150, 0, 1)  # Use fixed maximum value of 150
-        # Use YlGnBu colormap (from light yellow to blue-green)
-        cmap = plt.cm.YlGnBu
-        colored = (cmap(normalized_data)[:, :, :3] * 255).astype(np.uint8)
+        # width_map range is 0 to 150, fixed range normalization
+        # YlGnBu colormap (from light yellow to blue-green)
+        colored = Colormap.apply_colormap(data, 'width')
         # Set fixed tick values
         ticks = [0, 0.25, 0.5, 0.75, 1]
         tick_labels = ['0', '37.5', '75', '112.5', '150']  # Fixed width ticks
-        return colored, 'YlGnBu', ticks, tick_labels, 'Grasp Width (units)'
+        return colored, Colormap.MAP_COLORMAPS['width'], ticks, tick_labels, 'Grasp Width (units)'
 
     else:
         # Default case, use viridis colormap
-        normalized_data = np.clip(data, 0, 1)
-        cmap = plt.cm.viridis
-        colored = (cmap(normalized_data)[:, :, :3] * 255).astype(np.uint8)
+        colored = Colormap.apply_colormap(data, 'quality', colormap='viridis')
         return colored, 'viridis', [0, 0.5, 1], ['0', '0.5', '1'], 'Value'
 
 
 # Usage example
 if __name__ == "__main__":
-    file_path = "/path/to/your/file.mat"
+    file_path = "/path/to/your/file.glabel"
     data = read_and_visualize_dat(file_path)
     
     if data is not None:
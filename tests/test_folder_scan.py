@@ -0,0 +1,51 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication
+
+from QtPage.FolderScanner import FolderScanner
+from QtPage.MainWindow import MainWindow
+
+
+class StopFolderScanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = QApplication.instance() or QApplication([])
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.folder, 'cache')
+        os.makedirs(os.path.join(self.folder, 'images'))
+        for i in range(50):
+            open(os.path.join(self.folder, 'images', f'{i:03d}.png'), 'wb').close()
+
+        # Slot exceptions go to sys.excepthook, collect them instead of aborting
+        self.errors = []
+        hook = sys.excepthook
+        sys.excepthook = lambda *exc_info: self.errors.append(exc_info[1])
+        self.addCleanup(setattr, sys, 'excepthook', hook)
+        self.window = MainWindow()
+        self.addCleanup(self.window.close)
+
+    def test_stop_with_batches_queued(self):
+        batch_size = FolderScanner.BATCH_SIZE
+        FolderScanner.BATCH_SIZE = 1
+        self.addCleanup(setattr, FolderScanner, 'BATCH_SIZE', batch_size)
+
+        self.window.loadFolder(os.path.join(self.folder, 'images'))
+        self.window.folder_scanner.wait()  # Every batch is queued, none delivered
+        self.window.stopFolderScan()
+        self.window.FileListViewIns.file_model.clear()
+        for _ in range(3):
+            self.app.processEvents()
+
+        self.assertEqual(self.errors, [])
+        self.assertEqual(self.window.FileListViewIns.file_model.rowCount(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
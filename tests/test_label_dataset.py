@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from GraspCore.LabelDataset import LabelDataset
+from GraspCore.LabelFile import write_label
+
+
+class LabelDatasetIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        for i, name in enumerate(('a', 'b', 'c')):
+            data = np.full((4, 5, 3), i, dtype=np.float32)
+            write_label(os.path.join(self.folder, name + '.glabel'), data, source_name=name + '.png')
+        self.dataset = LabelDataset(self.folder)
+
+    def test_numpy_integer_index(self):
+        for key in (np.int64(1), np.int32(1), np.uint8(1), 1):
+            np.testing.assert_array_equal(self.dataset[key], self.dataset['b'])
+
+    def test_permutation_sampler(self):
+        order = np.random.default_rng(0).permutation(len(self.dataset))
+        values = [float(self.dataset[i][0, 0, 0]) for i in order]
+        self.assertEqual(values, [float(i) for i in order])
+
+    def test_name_index(self):
+        self.assertEqual(float(self.dataset['c'][0, 0, 0]), 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from GraspCore.GraspSet import GraspSet
+from GraspCore.LabelFile import read_label_header
+from GraspCore.LabelRegenerate import regenerate
+from GraspCore.LabelSidecar import label_matches_sidecar, read_sidecar, sidecar_path
+from GraspCore.LabelWriter import LabelWriter
+
+
+class InterruptedSaveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.source = os.path.join(self.folder, 'a.png')
+        with open(self.source, 'wb') as f:
+            f.write(b'image')
+        self.label = os.path.join(self.folder, 'labels', 'a.glabel')
+        self.writer = LabelWriter(workers=1)
+        self.addCleanup(self.writer.shutdown)
+
+    def save(self, count):
+        grasps = GraspSet()
+        for i in range(count):
+            grasps.add((10 + i, 10), (30 + i, 20), 0.3)
+        return self.writer.save(self.label, self.source, grasps, (), (64, 48)).result()
+
+    def matches(self):
+        return label_matches_sidecar(read_label_header(self.label), read_sidecar(sidecar_path(self.label))[2])
+
+    def test_completed_save_matches(self):
+        self.save(2)
+        self.assertTrue(self.matches())
+        self.assertEqual(read_label_header(self.label)['annotation']['grasps'], 2)
+
+    def test_crash_between_renames_leaves_newer_sidecar(self):
+        self.save(1)
+        replace = os.replace
+
+        def crash_on_label(src, dst):
+            if dst == self.label:
+                raise OSError('crashed')
+            replace(src, dst)
+        with mock.patch('GraspCore.LabelWriter.os.replace', crash_on_label):
+            with self.assertRaises(OSError):
+                self.save(3)
+
+        self.assertEqual(len(read_sidecar(sidecar_path(self.label))[0]), 3)
+        self.assertEqual(read_label_header(self.label)['annotation']['grasps'], 1)
+        self.assertFalse(self.matches())
+
+        regenerate([os.path.dirname(self.label)], log=lambda *args: None)
+        self.assertTrue(self.matches())
+        self.assertEqual(read_label_header(self.label)['annotation']['grasps'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()